@@ -0,0 +1,354 @@
+import hashlib
+import json
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BACKENDS = ("local", "openai", "fake")
+DEFAULT_SERVER_URL = "http://127.0.0.1:8080/v1"
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 300
+RETRIES = 3
+
+
+class CTransformersBackend:
+    """GGUF model run in-process through ctransformers.
+
+    ctransformers has no grammar support, so with ``constrained`` set the
+    stages that have a grammar are sampled by a Python loop that only
+    considers the tokens keeping the output a valid prefix of it.
+    """
+
+    def __init__(
+        self,
+        model_path,
+        model_type,
+        gpu_layers=0,
+        config=None,
+        constrained=False
+    ):
+        from ctransformers import AutoModelForCausalLM
+        config = dict(config or {})
+        config["gpu_layers"] = gpu_layers
+        self.config = config
+        self.constrained = constrained
+        self.model = AutoModelForCausalLM.from_pretrained(
+            model_path, model_type=model_type, **config
+        )
+        self._pieces = {}
+
+    def stream(self, prompt, profile=None):
+        if profile is None:
+            return self.model(prompt, stream=True)
+        config = profile.apply(self.config)
+        if self.constrained and profile.grammar is not None:
+            return self._constrained_stream(prompt, config, profile.grammar)
+        return self.model(
+            prompt,
+            stream=True,
+            max_new_tokens=config.get("max_new_tokens"),
+            temperature=config.get("temperature"),
+            seed=config.get("seed", -1),
+            stop=config["stop"],
+        )
+
+    def invoke(self, prompt, profile=None):
+        return "".join(self.stream(prompt, profile))
+
+    def count_tokens(self, text):
+        return len(self.model.tokenize(text))
+
+    def _piece(self, token):
+        if token not in self._pieces:
+            piece = self.model.detokenize([token], decode=False)
+            try:
+                self._pieces[token] = piece.decode("utf-8")
+            except UnicodeDecodeError:
+                # Partial UTF-8 sequences never fit the grammars.
+                self._pieces[token] = None
+        return self._pieces[token]
+
+    def _constrained_stream(self, prompt, config, grammar):
+        import numpy as np
+        model = self.model
+        seed = config.get("seed")
+        rng = np.random.default_rng(
+            seed if seed is not None and seed >= 0 else None
+        )
+        top_k = config.get("top_k") or 40
+        top_p = config.get("top_p") or 1.0
+        temperature = config.get("temperature") or 0.0
+        model.reset()
+        model.eval(model.tokenize(prompt))
+        text = ""
+        for _ in range(config.get("max_new_tokens", 1024)):
+            logits = np.asarray(model.logits, dtype=np.float32)
+            candidates = []
+            # Most likely tokens first, so usually only a handful of them
+            # have to be checked against the grammar.
+            for token in np.argsort(-logits):
+                token = int(token)
+                if model.is_eos_token(token):
+                    allowed = grammar.matches(text)
+                else:
+                    piece = self._piece(token)
+                    allowed = bool(piece) and grammar.accepts_prefix(
+                        text + piece
+                    )
+                if allowed:
+                    candidates.append(token)
+                    if len(candidates) == top_k:
+                        break
+            if not candidates:
+                break
+            token = candidates[0]
+            if temperature > 0 and len(candidates) > 1:
+                scores = logits[candidates] / temperature
+                probs = np.exp(scores - scores.max())
+                probs /= probs.sum()
+                keep = int(np.searchsorted(np.cumsum(probs), top_p)) + 1
+                keep = min(keep, len(candidates))
+                probs = probs[:keep] / probs[:keep].sum()
+                token = candidates[rng.choice(keep, p=probs)]
+            if model.is_eos_token(token):
+                break
+            piece = self._piece(token)
+            text += piece
+            yield piece
+            model.eval([token])
+
+
+class OpenAIBackend:
+    """Client for an OpenAI-compatible ``/completions`` endpoint.
+
+    Works with the llama.cpp server, vLLM and anything else that speaks
+    the same API. Requests share one keep-alive session whose connection
+    pool holds ``pool_size`` connections, so every factory thread reuses
+    an open connection. Connection errors and 429/5xx answers are retried
+    with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url=DEFAULT_SERVER_URL,
+        model=None,
+        config=None,
+        api_key=None,
+        pool_size=4,
+        timeout=READ_TIMEOUT,
+        constrained=False,
+    ):
+        self.url = base_url.rstrip("/") + "/completions"
+        self.timeout = (CONNECT_TIMEOUT, timeout)
+        self.model = model
+        self.config = config or {}
+        self.constrained = constrained
+        retry = Retry(
+            total=RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _params(self, profile):
+        config = profile.apply(self.config) if profile else self.config
+        params = {
+            "max_tokens": config.get("max_new_tokens", 1024),
+            "temperature": config.get("temperature", 0.8),
+            "top_p": config.get("top_p", 0.95),
+            "top_k": config.get("top_k", 40),
+            # vLLM reads repetition_penalty, the llama.cpp server reads
+            # repeat_penalty; both ignore the one they don't know.
+            "repetition_penalty": config.get("repetition_penalty", 1.1),
+            "repeat_penalty": config.get("repetition_penalty", 1.1),
+            "stop": config.get("stop", []),
+        }
+        if self.model:
+            params["model"] = self.model
+        if config.get("seed") is not None:
+            params["seed"] = config["seed"]
+        if self.constrained and profile and profile.grammar is not None:
+            # GBNF for the llama.cpp server, a regex for vLLM.
+            params["grammar"] = profile.grammar.gbnf
+            params["guided_regex"] = profile.grammar.regex
+        return params
+
+    def _post(self, prompt, stream, profile=None):
+        response = self.session.post(
+            self.url,
+            json=dict(self._params(profile), prompt=prompt, stream=stream),
+            stream=stream,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response
+
+    def stream(self, prompt, profile=None):
+        with self._post(prompt, True, profile) as response:
+            # The llama.cpp server sends text/event-stream without a
+            # charset, which requests would decode as ISO-8859-1.
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                text = choices[0].get("text")
+                if text:
+                    yield text
+
+    def invoke(self, prompt, profile=None):
+        response = self._post(prompt, False, profile)
+        return response.json()["choices"][0]["text"]
+
+
+class FakeBackend:
+    """Answers instantly without a model, for tests and benchmarks.
+
+    ``response`` is either a fixed string or a function of the prompt;
+    by default every prompt gets a short answer derived from its hash.
+    Every word counts as a token: answers are cut at the profile's
+    ``max_new_tokens``, ``prompt_delay`` seconds are spent before the
+    first word, as if the prompt was evaluated, and ``token_delay``
+    seconds on every word.
+    """
+
+    def __init__(self, response=None, token_delay=0.0, prompt_delay=0.0):
+        self.response = response
+        self.token_delay = token_delay
+        self.prompt_delay = prompt_delay
+        self.prompts = []
+
+    def _respond(self, prompt):
+        self.prompts.append(prompt)
+        if callable(self.response):
+            return self.response(prompt)
+        if self.response is not None:
+            return self.response
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"Fake response {digest[:8]}"
+
+    def stream(self, prompt, profile=None):
+        if self.prompt_delay:
+            time.sleep(self.prompt_delay)
+        pieces = re.findall(r"\s*\S+", self._respond(prompt))
+        if profile is not None and profile.max_new_tokens:
+            pieces = pieces[:profile.max_new_tokens]
+        for piece in pieces:
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield piece
+
+    def invoke(self, prompt, profile=None):
+        return "".join(self.stream(prompt, profile))
+
+    def count_tokens(self, text):
+        return len(re.findall(r"\s*\S+", text))
+
+
+def uses_local_model(args):
+    return args.llm_backend == "local"
+
+
+def backend_name(args):
+    if uses_local_model(args):
+        return "llama-cpp" if args.prefix_cache else "ctransformers"
+    return args.llm_backend
+
+
+def backend_model_id(args, model_path):
+    """Identify the model that answers, e.g. for response cache keys."""
+    if args.llm_backend == "openai":
+        return f"{args.llm_server}#{args.llm_server_model or ''}"
+    if args.llm_backend == "fake":
+        return "fake"
+    return model_path
+
+
+def create_backends(
+    args,
+    model_path,
+    model_type,
+    turn_marker,
+    gpu_layers,
+    config,
+    instances=None
+):
+    """Create the model instances for ``LLMPool``.
+
+    ``instances`` defaults to ``args.llm_instances``.
+    """
+    instances = instances or args.llm_instances
+    if args.llm_backend == "openai":
+        # The server schedules the requests, one client serves them all.
+        backend = OpenAIBackend(
+            args.llm_server,
+            model=args.llm_server_model,
+            config=config,
+            api_key=args.llm_server_key,
+            pool_size=instances,
+            constrained=args.constrained_decoding,
+        )
+        return [backend] * instances
+    if args.llm_backend == "fake":
+        return [FakeBackend() for _ in range(instances)]
+    from core.prefix_cache import PrefixCachedLlama
+    backends = []
+    for _ in range(instances):
+        if args.prefix_cache:
+            backends.append(PrefixCachedLlama(
+                model_path,
+                turn_marker=turn_marker,
+                gpu_layers=gpu_layers,
+                config=config,
+                constrained=args.constrained_decoding,
+            ))
+        else:
+            backends.append(CTransformersBackend(
+                model_path,
+                model_type=model_type,
+                gpu_layers=gpu_layers,
+                config=config,
+                constrained=args.constrained_decoding,
+            ))
+    return backends
+
+
+def add_backend_arguments(parser):
+    parser.add_argument(
+        "--llm-backend",
+        choices=BACKENDS,
+        default="local",
+        help="Where the LLM runs: in-process (local, through ctransformers or llama-cpp-python with --prefix-cache), on an OpenAI-compatible server such as the llama.cpp server or vLLM (openai), or nowhere, answering with placeholder text for tests (fake)",  # nopep8
+    )
+    parser.add_argument(
+        "--llm-server",
+        default=DEFAULT_SERVER_URL,
+        help=f"Base URL of the OpenAI-compatible server (default: {DEFAULT_SERVER_URL})",  # nopep8
+    )
+    parser.add_argument(
+        "--llm-server-model",
+        help="Model name to request from the server (only needed if it serves several)",  # nopep8
+    )
+    parser.add_argument(
+        "--llm-server-key",
+        help="API key sent to the server as a bearer token",
+    )
+    parser.add_argument(
+        "--constrained-decoding",
+        action="store_true",
+        help="Only let the LLM sample tokens that fit the expected format of the name (a short alphanumeric phrase) and the avatar prompt (a comma-separated tag list)",  # nopep8
+    )
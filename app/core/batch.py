@@ -0,0 +1,112 @@
+import argparse
+import csv
+import json
+import os
+
+BATCH_FIELDS = (
+    "name",
+    "summary",
+    "personality",
+    "scenario",
+    "greeting_message",
+    "example_messages",
+    "avatar_prompt",
+    "topic",
+    "gender",
+    "negative_prompt",
+    "seed",
+)
+
+
+class BatchSpecError(ValueError):
+    pass
+
+
+LLM_FIELDS = (
+    "name",
+    "summary",
+    "personality",
+    "scenario",
+    "greeting_message",
+    "example_messages",
+    "avatar_prompt",
+)
+
+
+def read_batch_specs(path):
+    """Read a JSONL or CSV spec file into a list of ``(line, row)`` pairs.
+
+    The whole file is parsed and validated up front, so a malformed row
+    fails the run before any model is loaded. Every problem, including an
+    unreadable file, is raised as a ``BatchSpecError`` naming the file and
+    the line.
+    """
+    try:
+        return _read_rows(path)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise BatchSpecError(f"{path}: {e}")
+
+
+def _read_rows(path):
+    rows = []
+    with open(path, newline="", encoding="utf-8") as spec_file:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            for line_no, row in enumerate(csv.DictReader(spec_file), 2):
+                rows.append((line_no, _validate_row(row, path, line_no)))
+        else:
+            for line_no, line in enumerate(spec_file, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise BatchSpecError(
+                        f"{path}:{line_no}: invalid JSON: {e}"
+                    )
+                rows.append((line_no, _validate_row(row, path, line_no)))
+    return rows
+
+
+def _validate_row(row, path, line_no):
+    if not isinstance(row, dict):
+        raise BatchSpecError(f"{path}:{line_no}: expected an object")
+    overrides = {}
+    for key, value in row.items():
+        if key is None:
+            # csv.DictReader keeps the values past the last column here.
+            raise BatchSpecError(
+                f"{path}:{line_no}: more values than columns"
+            )
+        field = key.strip().replace("-", "_")
+        if field not in BATCH_FIELDS:
+            raise BatchSpecError(f"{path}:{line_no}: unknown field '{key}'")
+        if value is None or value == "":
+            continue
+        if field == "seed":
+            if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+                value = int(value)
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise BatchSpecError(
+                    f"{path}:{line_no}: seed must be an integer, got {value!r}"
+                )
+            overrides[field] = value
+            continue
+        is_text = isinstance(value, (str, int, float))
+        if isinstance(value, bool) or not is_text:
+            raise BatchSpecError(
+                f"{path}:{line_no}: {key} must be text, got {value!r}"
+            )
+        overrides[field] = str(value)
+    return overrides
+
+
+def args_for_row(args, row):
+    values = vars(args).copy()
+    values.update(row)
+    values["batch"] = None
+    return argparse.Namespace(**values)
+
+
+def needs_llm(args):
+    return not all(getattr(args, field) for field in LLM_FIELDS)
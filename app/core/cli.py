@@ -0,0 +1,410 @@
+import os
+
+import aichar
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from core.batch import (
+    BatchSpecError,
+    args_for_row,
+    needs_llm,
+    read_batch_specs,
+)
+from core.downloader import ensure_model
+from core.generation import (
+    STAGE_PROFILES,
+    derive_seed,
+    generate_field,
+    new_master_seed,
+)
+from core.image_engine import (
+    DEFAULT_MODEL_PATH,
+    DEFAULT_MODEL_URL,
+    add_sd_arguments,
+    get_image_engine,
+    render_avatar,
+    sd_options,
+)
+from core.instrumentation import (
+    CharacterStats,
+    add_timing_arguments,
+    configure_timing_log,
+    timing_enabled,
+)
+from core.llm import add_llm_arguments, load_llm
+from core.metadata import add_json_metadata, add_yaml_metadata
+from core.pipeline import Stage, run_stages
+from core.profiles import get_profile
+
+llm = None
+profile = None
+
+
+def prepare_llm(args):
+    global llm
+    llm = load_llm(
+        args,
+        profile,
+        batch_size=args.llm_batch_size,
+        cache_bypass=args.cache_bypass,
+    )
+
+
+def prepare_sd(args):
+    get_image_engine(
+        idle_timeout=args.sd_idle_timeout, options=sd_options(args)
+    )
+    if args.sd_backend == "fake":
+        return
+    folder_path, filename = os.path.split(DEFAULT_MODEL_PATH)
+    try:
+        ensure_model(DEFAULT_MODEL_URL, folder_path, filename=filename)
+    except Exception as e:
+        print(f"Error while downloading Stable Diffusion model: {str(e)}")
+
+
+def generate(stage, seed, stats, **fields):
+    output = generate_field(llm, profile, stage, seed, stats, **fields)
+    print(output + "\n")
+    return output
+
+
+def create_character(args, stats=None):
+    topic = (
+        args.topic
+        if args.topic
+        else "any theme"
+    )
+    engine = get_image_engine(idle_timeout=args.sd_idle_timeout)
+    master_seed = args.seed if args.seed is not None else new_master_seed()
+    seeds = {
+        stage: derive_seed(master_seed, stage)
+        for stage in list(STAGE_PROFILES) + ["avatar"]
+    }
+    if args.avatar_seed is not None:
+        seeds["avatar"] = args.avatar_seed
+    stages = [
+        Stage(
+            "name",
+            lambda results: (
+                args.name
+                if args.name
+                else generate("name",
+                              seeds["name"],
+                              stats,
+                              topic=topic,
+                              gender=args.gender)
+            ),
+        ),
+        Stage(
+            "summary",
+            lambda results: (
+                args.summary
+                if args.summary
+                else generate("summary",
+                              seeds["summary"],
+                              stats,
+                              name=results["name"],
+                              topic=topic,
+                              gender=args.gender)
+            ),
+            requires=("name",),
+        ),
+        Stage(
+            "personality",
+            lambda results: (
+                args.personality
+                if args.personality
+                else generate("personality",
+                              seeds["personality"],
+                              stats,
+                              name=results["name"],
+                              summary=results["summary"],
+                              topic=topic)
+            ),
+            requires=("name", "summary"),
+        ),
+        Stage(
+            "scenario",
+            lambda results: (
+                args.scenario
+                if args.scenario
+                else generate("scenario",
+                              seeds["scenario"],
+                              stats,
+                              summary=results["summary"],
+                              personality=results["personality"],
+                              topic=topic)
+            ),
+            requires=("summary", "personality"),
+        ),
+        Stage(
+            "greeting_message",
+            lambda results: (
+                args.greeting_message
+                if args.greeting_message
+                else generate("greeting_message",
+                              seeds["greeting_message"],
+                              stats,
+                              name=results["name"],
+                              summary=results["summary"],
+                              personality=results["personality"],
+                              topic=topic)
+            ),
+            requires=("name", "summary", "personality"),
+        ),
+        Stage(
+            "example_messages",
+            lambda results: (
+                args.example_messages
+                if args.example_messages
+                else generate("example_messages",
+                              seeds["example_messages"],
+                              stats,
+                              name=results["name"],
+                              summary=results["summary"],
+                              personality=results["personality"],
+                              topic=topic)
+            ),
+            requires=("name", "summary", "personality"),
+        ),
+        Stage(
+            "avatar_prompt",
+            lambda results: (
+                args.avatar_prompt
+                if args.avatar_prompt
+                else generate("avatar_prompt",
+                              seeds["avatar_prompt"],
+                              stats,
+                              summary=results["summary"],
+                              topic=args.topic if args.topic else "")
+            ),
+            requires=("summary",),
+        ),
+        # Only queues the render on the image thread, so the LLM stages
+        # keep running while Stable Diffusion works on the avatar.
+        Stage(
+            "avatar",
+            lambda results: engine.submit(
+                render_avatar,
+                engine,
+                results["name"],
+                results["avatar_prompt"],
+                args.negative_prompt,
+                num_candidates=args.num_candidates,
+                seed=seeds["avatar"],
+                preview=args.preview,
+                stats=stats,
+            ),
+            requires=("name", "avatar_prompt"),
+        ),
+    ]
+    results = run_stages(stages)
+    character = aichar.create_character(
+        name=results["name"],
+        summary=results["summary"],
+        personality=results["personality"],
+        scenario=results["scenario"],
+        greeting_message=results["greeting_message"],
+        example_messages=results["example_messages"],
+        image_path="",
+    )
+    metadata = {
+        "seed": master_seed,
+        "stage_seeds": seeds,
+        "model_profile": profile.name,
+    }
+    return character, results["avatar"], metadata
+
+
+def parse_args(default_profile, argv=None):
+    parser = argparse.ArgumentParser(
+        description="Script created to help you generate characters for SillyTavern, TavernAI, TextGenerationWebUI using LLM and Stable Diffusion "  # nopep8
+    )
+    parser.add_argument(
+        "--name",
+        type=str,
+        help="Specify the character name (otherwise LLM will generate it)",  # nopep8
+    )
+    parser.add_argument(
+        "--summary",
+        type=str,
+        help="Specify the character's summary (otherwise LLM will generate it)",  # nopep8
+    )
+    parser.add_argument(
+        "--personality",
+        type=str,
+        help="Specify the character's personality (otherwise LLM will generate it)",  # nopep8
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        help="Specify the character's scenario (otherwise LLM will generate it)",  # nopep8
+    )
+    parser.add_argument(
+        "--greeting-message",
+        type=str,
+        help="Specify the character's greeting message (otherwise LLM will generate it)",  # nopep8
+    )
+    parser.add_argument(
+        "--example_messages",
+        type=str,
+        help="Specify example messages for the character (otherwise LLM will generate it)",  # nopep8
+    )
+    parser.add_argument(
+        "--avatar-prompt",
+        type=str,
+        help="Specify the prompt for generating the character's avatar (otherwise LLM will generate it)",  # nopep8
+    )
+    parser.add_argument(
+        "--topic",
+        type=str,
+        help="Specify the topic for character generation (Fantasy, Anime, Warrior, Dwarf etc)",  # nopep8
+    )
+    parser.add_argument(
+        "--gender",
+        type=str,
+        help="Specify the gender of the character (otherwise LLM will choose itself)",  # nopep8
+    )
+    parser.add_argument(
+        "--negative-prompt", type=str, help="Negative prompt for Stable Diffusion"  # nopep8
+    )
+    parser.add_argument(
+        "--num-candidates",
+        type=int,
+        default=1,
+        help="Render this many avatar candidates in one batch and save all of them (the first one is used for the character card)",  # nopep8
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Master seed of the character; every LLM stage and the avatar derive their own seed from it, so the same seed and options reproduce the same character (otherwise a random one is used and recorded in the exported files)",  # nopep8
+    )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="Render a quick low-step avatar preview with a tiny autoencoder; running again with the same --seed and without --preview renders the same avatar at full quality",  # nopep8
+    )
+    parser.add_argument(
+        "--avatar-seed",
+        type=int,
+        help="Seed of the avatar render (otherwise derived from --seed)",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-idle-timeout",
+        type=float,
+        help="Unload the Stable Diffusion model after this many idle seconds (by default it stays loaded)",  # nopep8
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        help="Generate one character per row of a JSONL or CSV spec file; each row can override any generation option",  # nopep8
+    )
+    parser.add_argument(
+        "--cache-bypass",
+        action="store_true",
+        help="Always generate fresh LLM responses (they still replace the cached ones)",  # nopep8
+    )
+    parser.add_argument(
+        "--llm-batch-size",
+        type=int,
+        default=1,
+        help="Generate this many characters of a --batch run at once; with --llm-backend openai, their requests are sent at the same time and a server with continuous batching decodes them together",  # nopep8
+    )
+    add_sd_arguments(parser)
+    add_llm_arguments(parser, default_profile)
+    add_timing_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def export_character_card(character, avatar, stats=None, metadata=None):
+    avatar.result()
+    character_name = character.name.replace(" ", "_")
+    character.image_path = f"{character_name}/{character_name}.png"
+    character.export_neutral_card_file(
+        f"{character_name}/{character_name}.card.png"
+    )
+    print(character.data_summary)
+    if stats is not None:
+        stats.log(
+            name=character.name,
+            seed=metadata["seed"],
+            model_profile=metadata["model_profile"],
+        )
+
+
+def generate_character(args):
+    stats = CharacterStats() if timing_enabled() else None
+    character, avatar, metadata = create_character(args, stats)
+    character_name = character.name.replace(" ", "_")
+    os.makedirs(character_name, exist_ok=True)
+    character_path = f"{character_name}/{character_name}"
+    character.export_neutral_json_file(character_path + ".json")
+    character.export_neutral_yaml_file(character_path + ".yml")
+    add_json_metadata(character_path + ".json", metadata)
+    add_yaml_metadata(character_path + ".yml", metadata)
+    print(f"Character seed: {metadata['seed']}")
+    # Queued behind the avatar render on the image thread.
+    engine = get_image_engine(idle_timeout=args.sd_idle_timeout)
+    return engine.submit(
+        export_character_card, character, avatar, stats, metadata
+    )
+
+
+def run_batch(args, rows):
+    generated = 0
+    failed = 0
+    pending = []
+    workers = max(1, args.llm_batch_size)
+
+    def finish(line_no, character):
+        nonlocal generated, failed
+        try:
+            character.result().result()
+            generated += 1
+        except Exception as e:
+            failed += 1
+            print(f"Error while generating character from {args.batch}:{line_no}: {str(e)}")  # nopep8
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for line_no, row in rows:
+            row_args = args_for_row(args, row)
+            if args.seed is not None and "seed" not in row:
+                # Every row gets its own seed, reproducible from --seed.
+                row_args.seed = derive_seed(args.seed, f"row {line_no}")
+            pending.append((
+                line_no,
+                pool.submit(generate_character, row_args),
+            ))
+            # The text of the next characters is generated while the
+            # image thread renders this one; don't let renders pile up
+            # beyond that.
+            while len(pending) > workers:
+                finish(*pending.pop(0))
+        for line_no, character in pending:
+            finish(line_no, character)
+    print(f"Batch finished: {generated} generated, {failed} failed")
+
+
+def main(default_profile):
+    global profile
+    args = parse_args(default_profile)
+    profile = get_profile(args.model_profile)
+    configure_timing_log(args.timing_log)
+    try:
+        rows = read_batch_specs(args.batch) if args.batch else None
+    except BatchSpecError as e:
+        raise SystemExit(f"Error in the --batch file: {e}")
+    if rows is not None:
+        llm_needed = any(needs_llm(args_for_row(args, row)) for _, row in rows)
+    else:
+        llm_needed = needs_llm(args)
+    # The LLM is neither downloaded, imported nor loaded when every
+    # field is given on the command line or in the spec file.
+    if llm_needed:
+        prepare_llm(args)
+    prepare_sd(args)
+    if rows is not None:
+        run_batch(args, rows)
+    else:
+        generate_character(args).result()
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from tqdm import tqdm
+
+CHUNK_SIZE = 8 * 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+TIMEOUT = 60
+RETRIES = 3
+
+_sha256_pattern = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(folder):
+    path = os.path.join(folder, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(folder, manifest):
+    _write_json(os.path.join(folder, MANIFEST_NAME), manifest)
+
+
+def ensure_model(url, folder, filename=None, connections=4, session=None):
+    """Return the local path of a model file, downloading it if needed.
+
+    A file counts as present only if it matches the size and sha256
+    recorded in the manifest (``models/manifest.json``). The manifest
+    also records the modification time of the verified file, so the file
+    is only hashed again once it changed. Files without a manifest entry
+    are checked against the size and checksum the server reports, a
+    truncated file left behind by an older download is resumed instead of
+    restarted and a corrupted one is downloaded again.
+    """
+    os.makedirs(folder, exist_ok=True)
+    filename = filename or os.path.basename(url)
+    path = os.path.join(folder, filename)
+    manifest = load_manifest(folder)
+    entry = manifest.get(filename, {})
+    if os.path.exists(path):
+        size = entry.get("size")
+        sha256 = entry.get("sha256")
+        if size is None:
+            try:
+                size, _, sha256 = _probe(session or requests.Session(), url)
+            except requests.RequestException:
+                return path
+        if size and os.path.getsize(path) != size:
+            print(f"{path} is incomplete, resuming the download")
+            os.replace(path, path + ".part")
+        elif _verified(path, entry) or not sha256:
+            return path
+        elif sha256_file(path) == sha256:
+            _record_model(folder, filename, url, sha256, path)
+            return path
+        else:
+            print(f"{path} is corrupted, downloading it again")
+            os.remove(path)
+    print(f"Downloading model from: {url}")
+    sha256, _ = download_file(
+        url,
+        path,
+        sha256=entry.get("sha256"),
+        connections=connections,
+        session=session,
+    )
+    _record_model(folder, filename, url, sha256, path)
+    print(f"Model downloaded and saved to: {path}")
+    return path
+
+
+def _verified(path, entry):
+    stat = os.stat(path)
+    return (
+        entry.get("sha256") is not None
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime") == stat.st_mtime_ns
+    )
+
+
+def _record_model(folder, filename, url, sha256, path):
+    stat = os.stat(path)
+    manifest = load_manifest(folder)
+    manifest[filename] = {
+        "url": url,
+        "sha256": sha256,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+    save_manifest(folder, manifest)
+
+
+def download_file(
+    url,
+    dest,
+    sha256=None,
+    connections=4,
+    chunk_size=CHUNK_SIZE,
+    session=None
+):
+    """Download ``url`` to ``dest`` and return ``(sha256, size)``.
+
+    Data goes to ``dest + ".part"`` and is renamed to ``dest`` only after
+    the checksum is verified. If the server accepts range requests, the
+    file is fetched in ``connections`` parallel ranges and an interrupted
+    download resumes where each range stopped. The checksum is ``sha256``
+    if given, otherwise the one the server advertises (Hugging Face sends
+    it as ``X-Linked-Etag``); with neither, it is only computed.
+    """
+    session = session or requests.Session()
+    part = dest + ".part"
+    state_path = part + ".json"
+    size, accepts_ranges, advertised = _probe(session, url)
+    expected = (sha256 or advertised or "").lower() or None
+
+    if size and accepts_ranges:
+        segments = _load_segments(part, state_path, size)
+        if segments is None:
+            done = os.path.getsize(part) if os.path.exists(part) else 0
+            segments = _plan_segments(min(done, size), size, connections)
+            with open(part, "ab") as f:
+                f.truncate(size)
+            _write_json(state_path, {"size": size, "segments": segments})
+        _fetch_segments(
+            session, url, part, state_path, size, segments, chunk_size
+        )
+    else:
+        _fetch_whole(session, url, part, size, chunk_size)
+        size = os.path.getsize(part)
+
+    actual = sha256_file(part, chunk_size)
+    if expected and actual != expected:
+        os.remove(part)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        raise ChecksumMismatch(
+            f"Checksum mismatch for {url}: expected {expected}, got {actual}"
+        )
+    os.replace(part, dest)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return actual, size
+
+
+def _probe(session, url):
+    with session.get(
+        url,
+        headers={"Range": "bytes=0-0"},
+        stream=True,
+        allow_redirects=True,
+        timeout=TIMEOUT,
+    ) as response:
+        response.raise_for_status()
+        advertised = None
+        for r in list(response.history) + [response]:
+            for header in ("X-Linked-Etag", "ETag"):
+                value = r.headers.get(header, "")
+                value = value.strip().removeprefix("W/").strip('"').lower()
+                if _sha256_pattern.match(value):
+                    advertised = value
+                    break
+            if advertised:
+                break
+        if response.status_code == 206:
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]  # nopep8
+            return (int(total) if total.isdigit() else 0), True, advertised
+        size = int(response.headers.get("content-length", 0))
+        return size, False, advertised
+
+
+def _plan_segments(start, size, connections):
+    remaining = size - start
+    count = max(1, min(connections, remaining // CHUNK_SIZE or 1))
+    step = -(-remaining // count)
+    segments = []
+    for offset in range(start, size, step or 1):
+        end = min(offset + step, size) - 1
+        segments.append({"start": offset, "end": end, "pos": offset})
+    if start:
+        segments.insert(0, {"start": 0, "end": start - 1, "pos": start})
+    return segments
+
+
+def _load_segments(part, state_path, size):
+    if not os.path.exists(state_path) or not os.path.exists(part):
+        return None
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except ValueError:
+        return None
+    if state.get("size") != size:
+        return None
+    return state["segments"]
+
+
+def _fetch_segments(session, url, part, state_path, size, segments, chunk_size):  # nopep8
+    lock = threading.Lock()
+    done = sum(segment["pos"] - segment["start"] for segment in segments)
+    progress = tqdm(
+        total=size,
+        initial=done,
+        unit="B",
+        unit_scale=True,
+        unit_divisor=1024
+    )
+
+    def fetch(segment):
+        for attempt in range(RETRIES):
+            if segment["pos"] > segment["end"]:
+                return
+            try:
+                _fetch_range(segment)
+                return
+            except requests.RequestException:
+                if attempt == RETRIES - 1:
+                    raise
+
+    def _fetch_range(segment):
+        headers = {"Range": f"bytes={segment['pos']}-{segment['end']}"}
+        with session.get(
+            url, headers=headers, stream=True, timeout=TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise IOError(f"Server ignored the range request for {url}")
+            with open(part, "r+b") as f:
+                f.seek(segment["pos"])
+                for data in response.iter_content(chunk_size=chunk_size):
+                    data = data[:segment["end"] - segment["pos"] + 1]
+                    f.write(data)
+                    f.flush()
+                    with lock:
+                        segment["pos"] += len(data)
+                        progress.update(len(data))
+                        _write_json(
+                            state_path, {"size": size, "segments": segments}
+                        )
+                    if segment["pos"] > segment["end"]:
+                        break
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+            for future in [pool.submit(fetch, s) for s in segments]:
+                future.result()
+    finally:
+        progress.close()
+
+
+def _fetch_whole(session, url, part, size, chunk_size):
+    with session.get(url, stream=True, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        progress = tqdm(
+            total=size,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024
+        )
+        with open(part, "wb") as f:
+            for data in response.iter_content(chunk_size=chunk_size):
+                f.write(data)
+                progress.update(len(data))
+        progress.close()
+    if size and os.path.getsize(part) != size:
+        raise IOError(f"Incomplete download of {url}")
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,175 @@
+import hashlib
+import random
+import re
+
+from core.instrumentation import StageTimer, timing_enabled
+
+
+class Grammar:
+    """Output format a constrained stage has to follow.
+
+    The same format is given three ways: ``gbnf`` for llama.cpp based
+    backends, ``regex`` for servers with regex guided decoding (vLLM), and
+    ``prefix`` / ``regex`` for the backends that mask tokens in Python;
+    ``prefix`` matches every string that can still grow into a match.
+    """
+
+    def __init__(self, gbnf, regex, prefix):
+        self.gbnf = gbnf
+        self.regex = regex
+        self._full = re.compile(regex)
+        self._prefix = re.compile(prefix)
+
+    def matches(self, text):
+        return self._full.fullmatch(text) is not None
+
+    def accepts_prefix(self, text):
+        return self._prefix.fullmatch(text) is not None
+
+
+_word = r"[A-Za-z0-9_][A-Za-z0-9_ -]*"
+_tag = r"[A-Za-z0-9][A-Za-z0-9 '()./:-]*"
+
+NAME_GRAMMAR = Grammar(
+    gbnf='root ::= " "? [A-Za-z0-9_] [A-Za-z0-9_ -]*',
+    regex=rf" ?{_word}",
+    prefix=rf" ?({_word})?",
+)
+
+TAG_LIST_GRAMMAR = Grammar(
+    gbnf=(
+        'root ::= " "? tag (", " tag)*\n'
+        "tag ::= [A-Za-z0-9] [A-Za-z0-9 '()./:-]*"
+    ),
+    regex=rf" ?{_tag}(, {_tag})*",
+    prefix=rf" ?({_tag}(, {_tag})*(, ?)?)?",
+)
+
+
+class GenerationProfile:
+    """Token budget and sampling settings for one generation stage.
+
+    ``max_new_tokens`` and ``temperature`` replace the model's defaults
+    when set; ``stop`` strings are added to the model's own stop strings,
+    so a stage can end early, e.g. at the first newline. With constrained
+    decoding enabled, backends only sample tokens that keep the output
+    within ``grammar``. A ``seed`` makes sampling reproducible.
+    """
+
+    def __init__(
+        self,
+        max_new_tokens=None,
+        stop=(),
+        temperature=None,
+        grammar=None,
+        seed=None
+    ):
+        self.max_new_tokens = max_new_tokens
+        self.stop = tuple(stop)
+        self.temperature = temperature
+        self.grammar = grammar
+        self.seed = seed
+
+    def with_seed(self, seed):
+        return GenerationProfile(
+            self.max_new_tokens,
+            self.stop,
+            self.temperature,
+            self.grammar,
+            seed,
+        )
+
+    def options(self):
+        options = {"stop": list(self.stop)}
+        if self.max_new_tokens is not None:
+            options["max_new_tokens"] = self.max_new_tokens
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        if self.grammar is not None:
+            options["grammar"] = self.grammar.regex
+        if self.seed is not None:
+            options["seed"] = self.seed
+        return options
+
+    def apply(self, config):
+        """Return a copy of the model ``config`` with this profile applied."""
+        stop = list(config.get("stop", []))
+        config = dict(config, **self.options())
+        config["stop"] = stop + [s for s in self.stop if s not in stop]
+        return config
+
+
+STAGE_PROFILES = {
+    "name": GenerationProfile(
+        max_new_tokens=16, stop=("\n",), grammar=NAME_GRAMMAR
+    ),
+    "summary": GenerationProfile(max_new_tokens=512),
+    "personality": GenerationProfile(max_new_tokens=256),
+    "scenario": GenerationProfile(max_new_tokens=512),
+    "greeting_message": GenerationProfile(max_new_tokens=384),
+    "example_messages": GenerationProfile(max_new_tokens=768),
+    "avatar_prompt": GenerationProfile(
+        max_new_tokens=128, stop=("\n",), grammar=TAG_LIST_GRAMMAR
+    ),
+}
+
+
+def new_master_seed():
+    return random.randint(0, 2**31 - 1)
+
+
+def derive_seed(master_seed, stage):
+    """Seed of one stage, derived from the master seed of a character."""
+    digest = hashlib.sha256(f"{master_seed}:{stage}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") & 0x7FFFFFFF
+
+
+def finish_output(stage, output):
+    if stage == "name":
+        output = re.sub(r"[^a-zA-Z0-9_ -]", "", output)
+    return output.strip()
+
+
+def stage_profile(stage, seed=None):
+    profile = STAGE_PROFILES[stage]
+    return profile if seed is None else profile.with_seed(seed)
+
+
+def stream_llm(llm, prompt, profile=None):
+    """Yield the text generated so far each time the model emits a token."""
+    text = ""
+    for piece in llm.stream(prompt, profile):
+        text += piece
+        yield text
+
+
+def generate_field(llm, profile, stage, seed=None, stats=None, **fields):
+    """Generate one character field with the prompts of a ``ModelProfile``.
+
+    With a timing log configured, the call is measured and recorded in
+    ``stats``, the ``CharacterStats`` of the character, if given. It is
+    streamed then, so the time to the first token is known.
+    """
+    prompt = profile.prompt(stage, **fields)
+    llm_profile = stage_profile(stage, seed)
+    if not timing_enabled():
+        return finish_output(stage, llm.invoke(prompt, llm_profile))
+    timer = StageTimer(stage)
+    output = ""
+    for output in stream_llm(llm, prompt, llm_profile):
+        timer.token()
+    timer.finish(llm, prompt, output, stats, model_profile=profile.name)
+    return finish_output(stage, output)
+
+
+def stream_field(llm, profile, stage, seed=None, stats=None, **fields):
+    """Like ``generate_field``, yielding the text generated so far."""
+    prompt = profile.prompt(stage, **fields)
+    timer = StageTimer(stage) if timing_enabled() else None
+    output = ""
+    for output in stream_llm(llm, prompt, stage_profile(stage, seed)):
+        if timer is not None:
+            timer.token()
+        yield finish_output(stage, output)
+    if timer is not None:
+        timer.finish(llm, prompt, output, stats, model_profile=profile.name)
@@ -0,0 +1,572 @@
+import os
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core.instrumentation import log_event, record_event
+
+DEFAULT_MODEL_PATH = "models/dreamshaper_8.safetensors"
+DEFAULT_MODEL_URL = "https://civitai.com/api/download/models/128713"
+HUB_MODEL = "Lykon/dreamshaper-8"
+EMBEDDING_CACHE_SIZE = 32
+DEVICES = ("auto", "cpu", "cuda", "mps")
+DTYPES = ("auto", "float32", "bfloat16", "float16")
+SCHEDULERS = ("default", "dpm++")
+SD_BACKENDS = ("diffusers", "fake")
+PREVIEW_VAE = "madebyollin/taesd"
+PREVIEW_STEPS = 8
+DEFAULT_STEPS = 50
+
+QUALITY_PREFIX = "absurdres, full hd, 8k, high quality, "
+DEFAULT_NEGATIVE_PROMPT = (
+    "worst quality, normal quality, low quality, low res, blurry, "
+    + "text, watermark, logo, banner, extra digits, cropped, "
+    + "jpeg artifacts, signature, username, error, sketch, "
+    + "duplicate, ugly, monochrome, horror, geometry, "
+    + "mutation, disgusting, "
+    + "bad anatomy, bad hands, three hands, three legs, "
+    + "bad arms, missing legs, missing arms, poorly drawn face, "
+    + " bad face, fused face, cloned face, worst face, "
+    + "three crus, extra crus, fused crus, worst feet, "
+    + "three feet, fused feet, fused thigh, three thigh, "
+    + "fused thigh, extra thigh, worst thigh, missing fingers, "
+    + "extra fingers, ugly fingers, long fingers, horn, "
+    + "extra eyes, huge eyes, 2girl, amputation, disconnected limbs"
+)
+
+
+class PromptEmbeddingCache:
+    """Least-recently-used cache of text encoder outputs, keyed on text.
+
+    Every avatar uses the same long default negative prompt, and renders
+    of the same character share their prompt, so most renders skip the
+    text encoder for at least one of the two.
+    """
+
+    def __init__(self, max_size=EMBEDDING_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, pipeline, text):
+        if text in self._entries:
+            self._entries.move_to_end(text)
+            return self._entries[text]
+        import torch
+        with torch.no_grad():
+            embeds, _ = pipeline.encode_prompt(
+                text,
+                pipeline.device,
+                num_images_per_prompt=1,
+                do_classifier_free_guidance=False,
+            )
+        self._entries[text] = embeds
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return embeds
+
+    def clear(self):
+        self._entries.clear()
+
+
+def cpu_supports_bf16():
+    """Whether the CPU computes bfloat16 natively (AVX512-BF16 or AMX)."""
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            flags = cpuinfo.read().split()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+class SDOptions:
+    """How the Stable Diffusion pipeline is run.
+
+    The defaults pick float16 on GPUs and, on CPU, bfloat16 where the CPU
+    has native support for it and float32 elsewhere, with the UNet and VAE
+    in channels-last memory format and PyTorch's scaled dot product
+    attention. ``attention_slicing`` lowers peak memory at some speed
+    cost, ``threads`` sets the number of CPU threads, and the ``dpm++``
+    scheduler (DPM++ 2M) gives comparable images in 15-20 ``steps``
+    instead of the default 50. The ``fake`` backend renders placeholder
+    images without a model.
+    """
+
+    def __init__(
+        self,
+        device="auto",
+        dtype="auto",
+        channels_last=True,
+        attention_slicing=False,
+        threads=None,
+        scheduler="default",
+        steps=None,
+        backend="diffusers",
+    ):
+        self.backend = backend
+        self.device = device
+        self.dtype = dtype
+        self.channels_last = channels_last
+        self.attention_slicing = attention_slicing
+        self.threads = threads
+        self.scheduler = scheduler
+        self.steps = steps
+
+    def resolve_device(self):
+        import torch
+        if self.device != "auto":
+            return self.device
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
+
+    def resolve_dtype(self, device):
+        import torch
+        if self.dtype != "auto":
+            return getattr(torch, self.dtype)
+        if device != "cpu":
+            return torch.float16
+        return torch.bfloat16 if cpu_supports_bf16() else torch.float32
+
+    def describe(self):
+        steps = self.steps or "default"
+        return (
+            f"device={self.device} dtype={self.dtype} "
+            f"channels_last={self.channels_last} "
+            f"attention_slicing={self.attention_slicing} "
+            f"threads={self.threads or 'default'} "
+            f"scheduler={self.scheduler} steps={steps}"
+        )
+
+
+class ImageEngine:
+    """Keeps the Stable Diffusion model loaded between renders.
+
+    ``model`` is either a local checkpoint file or a Hugging Face Hub
+    repository. The model is loaded on the first call to ``generate`` and
+    reused for every following call. If ``idle_timeout`` (seconds) is set,
+    the model is unloaded after that long without a render and
+    transparently reloaded on the next one. Prompt embeddings are cached
+    while the model stays loaded. ``options`` is an ``SDOptions``.
+
+    Previews are rendered in ``PREVIEW_STEPS`` steps of the same scheduler
+    as the final render and decoded with the tiny TAESD autoencoder;
+    rendering the same seed again without ``preview`` gives the full
+    quality version of the same image.
+    """
+
+    def __init__(
+        self,
+        model=DEFAULT_MODEL_PATH,
+        idle_timeout=None,
+        options=None
+    ):
+        self.model = model
+        self.idle_timeout = idle_timeout
+        self.options = options or SDOptions()
+        self.pipeline = None
+        self.safety_checker = None
+        self.embeddings = PromptEmbeddingCache()
+        self._preview = None
+        self._lock = threading.RLock()
+        self._idle_timer = None
+        self._worker = None
+
+    @property
+    def loaded(self):
+        return self.pipeline is not None
+
+    def load(self):
+        with self._lock:
+            if self.pipeline is not None:
+                return self.pipeline
+            from diffusers import StableDiffusionPipeline
+            import torch
+            options = self.options
+            device = options.resolve_device()
+            dtype = options.resolve_dtype(device)
+            print({
+                "cuda": "Loading Stable Diffusion to GPU...",
+                "mps": "Loading Stable Diffusion to Metal...",
+            }.get(device, "Loading Stable Diffusion to CPU..."))
+            start = time.perf_counter()
+            if os.path.isfile(self.model):
+                pipeline = StableDiffusionPipeline.from_single_file(
+                    self.model, torch_dtype=dtype
+                )
+            else:
+                pipeline = StableDiffusionPipeline.from_pretrained(
+                    self.model,
+                    torch_dtype=dtype,
+                    variant="fp16" if dtype == torch.float16 else None,
+                    low_cpu_mem_usage=False,
+                )
+            pipeline.to(device)
+            if device == "cpu":
+                if options.threads:
+                    torch.set_num_threads(options.threads)
+                if options.channels_last:
+                    pipeline.unet.to(memory_format=torch.channels_last)
+                    pipeline.vae.to(memory_format=torch.channels_last)
+            if options.attention_slicing:
+                pipeline.enable_attention_slicing()
+            else:
+                from diffusers.models.attention_processor import (
+                    AttnProcessor2_0,
+                )
+                pipeline.unet.set_attn_processor(AttnProcessor2_0())
+            if options.scheduler == "dpm++":
+                from diffusers import DPMSolverMultistepScheduler
+                pipeline.scheduler = DPMSolverMultistepScheduler.from_config(
+                    pipeline.scheduler.config,
+                    algorithm_type="dpmsolver++",
+                    use_karras_sigmas=True,
+                )
+            self.safety_checker = pipeline.safety_checker
+            self.pipeline = pipeline
+            log_event(
+                "model_load",
+                model=self.model,
+                kind="stable-diffusion",
+                device=device,
+                dtype=str(dtype).replace("torch.", ""),
+                seconds=round(time.perf_counter() - start, 3),
+            )
+            return pipeline
+
+    def unload(self):
+        with self._lock:
+            self._cancel_idle_timer()
+            if self.pipeline is None:
+                return
+            import torch
+            self.pipeline = None
+            self.safety_checker = None
+            self._preview = None
+            self.embeddings.clear()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            print("Unloaded Stable Diffusion model")
+
+    def generate(
+        self,
+        prompt,
+        negative_prompt="",
+        seed=None,
+        width=512,
+        height=512,
+        nsfw_filter=False,
+        num_images=1,
+        preview=False,
+        stats=None
+    ):
+        """Render ``num_images`` images of ``prompt`` in one batch.
+
+        The render time is logged and added to ``stats``, the
+        ``CharacterStats`` of the character, if given.
+        """
+        with self._lock:
+            self._cancel_idle_timer()
+            pipeline = self.load()
+            import torch
+            vae = pipeline.vae
+            # Filtered images come back black.
+            pipeline.safety_checker = (
+                self.safety_checker if nsfw_filter else None
+            )
+            pipeline.requires_safety_checker = bool(pipeline.safety_checker)
+            steps = {}
+            if self.options.steps:
+                steps["num_inference_steps"] = self.options.steps
+            if preview:
+                # Only the step count changes: another sampler or sigma
+                # schedule would draw a different image from the same seed.
+                pipeline.vae = self._preview_vae()
+                steps["num_inference_steps"] = PREVIEW_STEPS
+            generator = torch.Generator("cpu").manual_seed(
+                seed if seed is not None else random.randint(0, 2**32 - 1)
+            )
+            start = time.perf_counter()
+            try:
+                images = pipeline(
+                    prompt_embeds=self.embeddings.get(pipeline, prompt),
+                    negative_prompt_embeds=self.embeddings.get(
+                        pipeline, negative_prompt or ""
+                    ),
+                    width=width,
+                    height=height,
+                    num_images_per_prompt=num_images,
+                    generator=generator,
+                    **steps
+                ).images
+            finally:
+                pipeline.vae = vae
+                self._schedule_unload()
+            seconds = time.perf_counter() - start
+            num_steps = steps.get("num_inference_steps", DEFAULT_STEPS)
+            record_event(
+                "avatar_render",
+                {
+                    "steps": num_steps,
+                    "images": num_images,
+                    "width": width,
+                    "height": height,
+                    "preview": preview,
+                    "seconds": round(seconds, 3),
+                    "steps_per_second": round(num_steps / seconds, 2),
+                },
+                stats,
+            )
+            return images
+
+    def _preview_vae(self):
+        if self._preview is None:
+            from diffusers import AutoencoderTiny
+            pipeline = self.pipeline
+            self._preview = AutoencoderTiny.from_pretrained(
+                PREVIEW_VAE, torch_dtype=pipeline.vae.dtype
+            ).to(pipeline.device)
+        return self._preview
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn`` on the engine's image thread and return its future.
+
+        Jobs run one at a time in submission order, so the caller can keep
+        generating text while the avatar renders.
+        """
+        with self._lock:
+            if self._worker is None:
+                self._worker = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="image"
+                )
+        return self._worker.submit(fn, *args, **kwargs)
+
+    def _schedule_unload(self):
+        if not self.idle_timeout or self.idle_timeout <= 0:
+            return
+        self._idle_timer = threading.Timer(self.idle_timeout, self.unload)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+
+class FakeImageEngine(ImageEngine):
+    """Renders single-colour placeholder images without a model.
+
+    The colour is derived from the prompt and the seed, so renders are
+    deterministic. ``render_delay`` seconds are spent on every image.
+    Meant for tests and benchmarks of everything around the model.
+    """
+
+    def __init__(
+        self,
+        model=DEFAULT_MODEL_PATH,
+        idle_timeout=None,
+        options=None,
+        render_delay=0.0
+    ):
+        super().__init__(model, idle_timeout, options)
+        self.render_delay = render_delay
+
+    def load(self):
+        self.pipeline = self
+        return self
+
+    def unload(self):
+        self.pipeline = None
+
+    def generate(
+        self,
+        prompt,
+        negative_prompt="",
+        seed=None,
+        width=512,
+        height=512,
+        nsfw_filter=False,
+        num_images=1,
+        preview=False,
+        stats=None
+    ):
+        from PIL import Image
+        with self._lock:
+            self.load()
+            start = time.perf_counter()
+            if self.render_delay:
+                time.sleep(self.render_delay * num_images)
+            images = []
+            for index in range(num_images):
+                digest = hashlib.sha256(
+                    f"{prompt}:{seed}:{index}".encode("utf-8")
+                ).digest()
+                images.append(
+                    Image.new("RGB", (width, height), tuple(digest[:3]))
+                )
+            num_steps = PREVIEW_STEPS if preview else (
+                self.options.steps or DEFAULT_STEPS
+            )
+            seconds = time.perf_counter() - start
+            record_event(
+                "avatar_render",
+                {
+                    "steps": num_steps,
+                    "images": num_images,
+                    "width": width,
+                    "height": height,
+                    "preview": preview,
+                    "seconds": round(seconds, 3),
+                    "steps_per_second": (
+                        round(num_steps / seconds, 2) if seconds > 0 else None
+                    ),
+                },
+                stats,
+            )
+            return images
+
+
+def create_image_engine(
+    model=DEFAULT_MODEL_PATH,
+    idle_timeout=None,
+    options=None
+):
+    """Create the engine for the backend chosen in ``options``."""
+    if options is not None and options.backend == "fake":
+        return FakeImageEngine(model, idle_timeout, options)
+    return ImageEngine(model, idle_timeout, options)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_image_engine(
+    model=DEFAULT_MODEL_PATH,
+    idle_timeout=None,
+    options=None
+):
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_image_engine(model, idle_timeout, options)
+        elif idle_timeout is not None:
+            _engine.idle_timeout = idle_timeout
+        return _engine
+
+
+def candidate_path(character_name, index, output_dir="."):
+    character_name = character_name.replace(" ", "_")
+    return os.path.join(
+        output_dir, character_name, f"{character_name}_{index + 1}.png"
+    )
+
+
+def render_avatar(
+    engine,
+    character_name,
+    prompt,
+    negative_prompt=None,
+    output_dir=".",
+    nsfw_filter=False,
+    num_candidates=1,
+    seed=None,
+    preview=False,
+    stats=None
+):
+    """Render the avatar and save it as ``<output_dir>/<name>/<name>.png``.
+
+    With several ``num_candidates``, all of them are rendered in one batch
+    and also saved as ``<name>_1.png``, ``<name>_2.png`` and so on; the
+    first one becomes the avatar. Candidates left over from an earlier
+    render are removed. Returns the list of images and the seed, which
+    renders the same images again, e.g. at full quality after a
+    ``preview``.
+    """
+    if seed is None:
+        seed = random.randint(0, 2**32 - 1)
+    images = engine.generate(
+        QUALITY_PREFIX + prompt,
+        negative_prompt=DEFAULT_NEGATIVE_PROMPT + (negative_prompt or ""),
+        seed=seed,
+        width=512,
+        height=512,
+        nsfw_filter=nsfw_filter,
+        num_images=num_candidates,
+        preview=preview,
+        stats=stats,
+    )
+    character_name = character_name.replace(" ", "_")
+    os.makedirs(os.path.join(output_dir, character_name), exist_ok=True)
+    images[0].save(
+        os.path.join(output_dir, character_name, character_name + ".png")
+    )
+    if len(images) > 1:
+        for index, image in enumerate(images):
+            image.save(candidate_path(character_name, index, output_dir))
+    # Candidates of an earlier render with more images are stale now.
+    index = len(images) if len(images) > 1 else 0
+    while os.path.exists(candidate_path(character_name, index, output_dir)):
+        os.remove(candidate_path(character_name, index, output_dir))
+        index += 1
+    print(f"Generated character {'avatar preview' if preview else 'avatar'} (seed {seed})")  # nopep8
+    return images, seed
+
+
+def add_sd_arguments(parser):
+    parser.add_argument(
+        "--sd-backend",
+        choices=SD_BACKENDS,
+        default="diffusers",
+        help="How avatars are rendered: with Stable Diffusion through diffusers, or with single-colour placeholder images and no model, for tests and benchmarks (fake)",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-device",
+        choices=DEVICES,
+        default="auto",
+        help="Device Stable Diffusion runs on (default: the GPU if there is one)",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-dtype",
+        choices=DTYPES,
+        default="auto",
+        help="Precision of the Stable Diffusion weights (default: float16 on GPUs; bfloat16 on CPUs that support it natively, float32 on other CPUs)",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-threads",
+        type=int,
+        help="Number of CPU threads Stable Diffusion uses on CPU (default: PyTorch's choice)",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-attention-slicing",
+        action="store_true",
+        help="Compute attention in slices to lower peak memory, at some speed cost",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-scheduler",
+        choices=SCHEDULERS,
+        default="default",
+        help="Sampler to render avatars with; dpm++ (DPM++ 2M Karras) needs far fewer steps",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-steps",
+        type=int,
+        help="Number of denoising steps (default: 50; 15-20 is enough with --sd-scheduler dpm++)",  # nopep8
+    )
+
+
+def sd_options(args):
+    return SDOptions(
+        device=args.sd_device,
+        dtype=args.sd_dtype,
+        attention_slicing=args.sd_attention_slicing,
+        threads=args.sd_threads,
+        scheduler=args.sd_scheduler,
+        steps=args.sd_steps,
+        backend=args.sd_backend,
+    )
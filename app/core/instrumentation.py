@@ -0,0 +1,176 @@
+import json
+import sys
+import threading
+import time
+import uuid
+
+_log = None
+_log_lock = threading.Lock()
+_listeners = []
+
+
+def configure_timing_log(path):
+    """Write timing events to ``path``; ``-`` is stdout, None turns it off."""
+    global _log
+    with _log_lock:
+        if _log is not None and _log is not sys.stdout:
+            _log.close()
+        if path is None:
+            _log = None
+        elif path == "-":
+            _log = sys.stdout
+        else:
+            _log = open(path, "a", encoding="utf-8")
+
+
+def add_event_listener(listener):
+    """Call ``listener`` with every event, e.g. to update metrics."""
+    _listeners.append(listener)
+
+
+def timing_enabled():
+    return _log is not None or bool(_listeners)
+
+
+def log_event(event, **fields):
+    """Pass one event to the listeners and write it as a line of JSON.
+
+    Nothing is measured or written without a timing log or a listener.
+    """
+    if not timing_enabled():
+        return
+    record = {"event": event, "time": round(time.time(), 3)}
+    record.update(fields)
+    for listener in _listeners:
+        listener(record)
+    if _log is None:
+        return
+    line = json.dumps(record, ensure_ascii=False)
+    with _log_lock:
+        _log.write(line + "\n")
+        _log.flush()
+
+
+def count_tokens(llm, text):
+    """Number of tokens of ``text`` for the model behind ``llm``.
+
+    Backends without a tokenizer on this side, like OpenAI-compatible
+    servers, get an estimate of four characters per token.
+    """
+    counter = getattr(llm, "count_tokens", None)
+    if counter is not None:
+        return counter(text)
+    return (len(text) + 3) // 4
+
+
+class StageTimer:
+    """Measures the LLM call of one generation stage.
+
+    Call ``token`` whenever streamed text arrives and ``finish`` with the
+    prompt and the output once the call returned.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.first_token = None
+
+    def token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self, llm, prompt, output, stats=None, **fields):
+        seconds = time.perf_counter() - self.start
+        generated = count_tokens(llm, output)
+        record = {
+            "stage": self.stage,
+            "prompt_tokens": count_tokens(llm, prompt),
+            "generated_tokens": generated,
+            "seconds": round(seconds, 3),
+            "time_to_first_token": None,
+        }
+        # The decode rate starts at the first token, when one was streamed,
+        # so prompt evaluation is left out.
+        decode_seconds = seconds
+        if self.first_token is not None:
+            ttft = self.first_token - self.start
+            record["time_to_first_token"] = round(ttft, 3)
+            decode_seconds = seconds - ttft
+        record["tokens_per_second"] = None
+        if decode_seconds > 0:
+            record["tokens_per_second"] = round(generated / decode_seconds, 2)
+        record.update(fields)
+        record_event("stage", record, stats)
+        return record
+
+
+def record_event(event, record, stats=None):
+    """Log ``record`` and add it to the ``CharacterStats`` it belongs to."""
+    if stats is not None:
+        record["character"] = stats.id
+        stats.add(event, record)
+    log_event(event, **record)
+
+
+class CharacterStats:
+    """Collects the timing records of the stages of one character.
+
+    Stages run on several threads, so records are added under a lock.
+    ``summary`` aggregates them, ``log`` writes the summary as a
+    ``character`` event.
+    """
+
+    def __init__(self, character_id=None):
+        self.id = (
+            character_id if character_id is not None else uuid.uuid4().hex[:12]
+        )
+        self.start = time.perf_counter()
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, event, record):
+        with self._lock:
+            self.records.append((event, record))
+
+    def summary(self):
+        with self._lock:
+            records = list(self.records)
+        stages = [record for event, record in records if event == "stage"]
+        renders = [
+            record for event, record in records if event == "avatar_render"
+        ]
+        seconds = {record["stage"]: record["seconds"] for record in stages}
+        if renders:
+            seconds["avatar"] = round(
+                sum(record["seconds"] for record in renders), 3
+            )
+        return {
+            "seconds": round(time.perf_counter() - self.start, 3),
+            "llm_seconds": round(
+                sum(record["seconds"] for record in stages), 3
+            ),
+            "sd_seconds": seconds.get("avatar", 0.0),
+            "prompt_tokens": sum(record["prompt_tokens"] for record in stages),
+            "generated_tokens": sum(
+                record["generated_tokens"] for record in stages
+            ),
+            "slowest_stage": (
+                max(seconds, key=seconds.get) if seconds else None
+            ),
+            "stage_seconds": seconds,
+        }
+
+    def log(self, **fields):
+        summary = self.summary()
+        summary.update(fields)
+        log_event("character", character=self.id, **summary)
+        return summary
+
+
+def add_timing_arguments(parser):
+    parser.add_argument(
+        "--timing-log",
+        nargs="?",
+        const="-",
+        help="Write the timing of every generation stage, avatar render and model load, and a summary per character, as JSON lines to this file (stdout without a path)",  # nopep8
+    )
@@ -0,0 +1,131 @@
+import os
+import time
+
+from core.backends import (
+    add_backend_arguments,
+    backend_model_id,
+    backend_name,
+    create_backends,
+    uses_local_model,
+)
+from core.downloader import ensure_model
+from core.instrumentation import log_event
+from core.pipeline import LLMPool
+from core.profiles import MODELS_DIR, PROFILES
+from core.response_cache import CachedLLM, DEFAULT_CACHE_PATH, ResponseCache  # nopep8
+
+
+def llm_config(profile, gpu_layers=0):
+    return {
+        "max_new_tokens": 1024,
+        "repetition_penalty": 1.1,
+        "top_k": 40,
+        "top_p": 0.95,
+        "temperature": 0.8,
+        "context_length": profile.context_length,
+        "gpu_layers": gpu_layers,
+        "stop": list(profile.stop),
+    }
+
+
+def load_llm(
+    args,
+    profile,
+    batch_size=1,
+    cache_bypass=False,
+    set_status=print
+):
+    """Download the model of ``profile`` if needed and load the LLM stack.
+
+    The model instances are pooled and, with ``--llm-cache``, fronted by
+    the response cache. A server gets at least ``batch_size`` requests at
+    once, which it batches itself.
+    """
+    gpu_layers = 0
+    if uses_local_model(args):
+        set_status("Downloading the LLM model...")
+        try:
+            ensure_model(profile.url, MODELS_DIR)
+        except Exception as e:
+            print(f"Error while downloading LLM model: {str(e)}")
+        import torch
+        if torch.cuda.is_available() or torch.backends.mps.is_available():
+            gpu_layers = 110
+            set_status("Loading LLM to GPU...")
+        else:
+            set_status("Loading LLM to CPU...")
+    config = llm_config(profile, gpu_layers)
+    if args.llm_instances > 1 and uses_local_model(args):
+        config["threads"] = max(1, (os.cpu_count() or 1) // args.llm_instances)
+    start = time.perf_counter()
+    instances = args.llm_instances
+    if not uses_local_model(args):
+        instances = max(instances, batch_size)
+    llm = LLMPool(create_backends(
+        args,
+        profile.model_path,
+        model_type=profile.model_type,
+        turn_marker=profile.turn_marker,
+        gpu_layers=gpu_layers,
+        config=config,
+        instances=instances,
+    ))
+    log_event(
+        "model_load",
+        model=profile.name,
+        kind="llm",
+        backend=backend_name(args),
+        instances=instances,
+        gpu_layers=gpu_layers,
+        seconds=round(time.perf_counter() - start, 3),
+    )
+    if args.llm_cache:
+        # Everything that changes the output is part of the cache key.
+        sampling = {
+            key: value
+            for key, value in config.items()
+            if key not in ("gpu_layers", "threads")
+        }
+        sampling["backend"] = backend_name(args)
+        sampling["constrained"] = args.constrained_decoding
+        llm = CachedLLM(
+            llm,
+            ResponseCache(args.llm_cache, args.llm_cache_size * 1024 * 1024),
+            model=backend_model_id(args, profile.model_path),
+            config=sampling,
+            bypass=cache_bypass,
+        )
+    return llm
+
+
+def add_llm_arguments(parser, default_profile):
+    parser.add_argument(
+        "--model-profile",
+        choices=sorted(PROFILES),
+        default=default_profile,
+        help=f"LLM to generate the text with, one of the registered model profiles and quantizations (default: {default_profile})",  # nopep8
+    )
+    parser.add_argument(
+        "--prefix-cache",
+        action="store_true",
+        help="Cache the evaluated few-shot prompt prefixes (requires llama-cpp-python)",  # nopep8
+    )
+    parser.add_argument(
+        "--llm-instances",
+        type=int,
+        default=1,
+        help="Number of LLM instances to load, each one serves one request at a time so independent fields are generated in parallel (each one needs its own memory)",  # nopep8
+    )
+    parser.add_argument(
+        "--llm-cache",
+        nargs="?",
+        const=DEFAULT_CACHE_PATH,
+        help=f"Reuse LLM responses for identical prompts and settings from an on-disk cache (default path: {DEFAULT_CACHE_PATH})",  # nopep8
+    )
+    parser.add_argument(
+        "--llm-cache-size",
+        type=int,
+        default=256,
+        help="Maximum size of the LLM response cache in MB; the least recently used responses are evicted first",  # nopep8
+    )
+    add_backend_arguments(parser)
@@ -0,0 +1,21 @@
+import json
+
+
+def add_json_metadata(path, metadata):
+    """Store ``metadata`` under a ``metadata`` key of an exported JSON file."""
+    with open(path, encoding="utf-8") as json_file:
+        data = json.load(json_file)
+    data["metadata"] = metadata
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file, indent=4, ensure_ascii=False)
+
+
+def add_yaml_metadata(path, metadata):
+    """Append ``metadata`` as a ``metadata`` key to an exported YAML file."""
+    with open(path, encoding="utf-8") as yaml_file:
+        ends_with_newline = yaml_file.read().endswith("\n")
+    with open(path, "a", encoding="utf-8") as yaml_file:
+        if not ends_with_newline:
+            yaml_file.write("\n")
+        # JSON is valid YAML flow style, so no YAML library is needed.
+        yaml_file.write(f"metadata: {json.dumps(metadata)}\n")
@@ -0,0 +1,160 @@
+import functools
+import inspect
+import sys
+import time
+from contextlib import contextmanager
+
+from core.instrumentation import add_event_listener
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+class WebUIMetrics:
+    """Prometheus metrics of the WebUI, served at ``/metrics``.
+
+    Handlers wrapped with ``track`` count their requests and latencies;
+    generated tokens and rendered images come from the instrumentation
+    events. Process memory is exported by the default process collector.
+    """
+
+    def __init__(self):
+        try:
+            from prometheus_client import Counter, Gauge, Histogram
+        except ImportError:
+            raise ImportError(
+                "The metrics endpoint needs prometheus-client, install it with: pip install prometheus-client"  # nopep8
+            )
+        self.requests = Counter(
+            "character_factory_requests",
+            "Requests handled, by handler and outcome",
+            ["handler", "status"],
+        )
+        self.latency = Histogram(
+            "character_factory_request_seconds",
+            "Time a handler took to finish a request, queueing excluded",
+            ["handler"],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.in_progress = Gauge(
+            "character_factory_requests_in_progress",
+            "Requests being processed right now",
+            ["handler"],
+        )
+        self.queue_depth = Gauge(
+            "character_factory_queue_depth",
+            "Requests waiting in the WebUI queue",
+        )
+        self.prompt_tokens = Counter(
+            "character_factory_llm_prompt_tokens",
+            "Prompt tokens sent to the LLM, by stage",
+            ["stage"],
+        )
+        self.generated_tokens = Counter(
+            "character_factory_llm_generated_tokens",
+            "Tokens generated by the LLM, by stage",
+            ["stage"],
+        )
+        self.images = Counter(
+            "character_factory_sd_images",
+            "Images rendered by Stable Diffusion",
+            ["preview"],
+        )
+        self.render_seconds = Histogram(
+            "character_factory_sd_render_seconds",
+            "Time of one Stable Diffusion batch",
+            ["preview"],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.model_loaded = Gauge(
+            "character_factory_model_loaded",
+            "Whether the model is loaded in memory",
+            ["model"],
+        )
+        self.model_load_seconds = Gauge(
+            "character_factory_model_load_seconds",
+            "Time the last load of the model took",
+            ["model"],
+        )
+        self.gpu_memory = Gauge(
+            "character_factory_gpu_memory_allocated_bytes",
+            "Memory allocated by PyTorch on the GPU",
+        )
+        self.gpu_memory.set_function(gpu_memory_allocated)
+        add_event_listener(self.observe_event)
+
+    def track(self, handler, fn):
+        """Wrap the event handler ``fn`` to count it as ``handler``."""
+        if inspect.isgeneratorfunction(fn):
+            # Streaming handlers are done when their last update is sent.
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self._request(handler):
+                    yield from fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self._request(handler):
+                    return fn(*args, **kwargs)
+        return wrapper
+
+    @contextmanager
+    def _request(self, handler):
+        start = time.perf_counter()
+        self.in_progress.labels(handler).inc()
+        status = "error"
+        try:
+            yield
+            status = "success"
+        except GeneratorExit:
+            # The client went away while the handler was streaming.
+            status = "cancelled"
+            raise
+        finally:
+            self.in_progress.labels(handler).dec()
+            self.latency.labels(handler).observe(time.perf_counter() - start)
+            self.requests.labels(handler, status).inc()
+
+    def observe_event(self, record):
+        event = record["event"]
+        if event == "stage":
+            self.prompt_tokens.labels(record["stage"]).inc(
+                record["prompt_tokens"]
+            )
+            self.generated_tokens.labels(record["stage"]).inc(
+                record["generated_tokens"]
+            )
+        elif event == "avatar_render":
+            preview = str(bool(record.get("preview"))).lower()
+            self.images.labels(preview).inc(record["images"])
+            self.render_seconds.labels(preview).observe(record["seconds"])
+        elif event == "model_load":
+            self.model_load_seconds.labels(record["kind"]).set(
+                record["seconds"]
+            )
+
+    def watch_model(self, model, is_loaded):
+        """Report ``is_loaded()`` as the residency of ``model``."""
+        self.model_loaded.labels(model).set_function(
+            lambda: 1 if is_loaded() else 0
+        )
+
+    def watch_queue(self, queue_depth):
+        self.queue_depth.set_function(queue_depth)
+
+    def add_route(self, app):
+        """Serve the metrics at ``/metrics`` of the WebUI's FastAPI app."""
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+        from starlette.responses import Response
+
+        def metrics():
+            return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+        app.add_api_route("/metrics", metrics, methods=["GET"])
+
+
+def gpu_memory_allocated():
+    # torch is only asked if something already imported it.
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return 0
+    return torch.cuda.memory_allocated()
@@ -0,0 +1,87 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from queue import Queue
+
+from core.instrumentation import count_tokens
+
+
+class Stage:
+    """One node of the generation graph.
+
+    ``fn`` is called with a dict holding the results of every stage that
+    has finished so far, and its return value becomes this stage's result.
+    """
+
+    def __init__(self, name, fn, requires=()):
+        self.name = name
+        self.fn = fn
+        self.requires = tuple(requires)
+
+
+def run_stages(stages, max_workers=None):
+    """Run every stage as soon as the stages it requires are done.
+
+    Independent stages run concurrently. Returns a dict of stage name to
+    result; the first exception raised by a stage is re-raised.
+    """
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Stage names must be unique")
+    for stage in stages:
+        for dependency in stage.requires:
+            if dependency not in names:
+                raise ValueError(
+                    f"Stage '{stage.name}' requires unknown stage '{dependency}'"  # nopep8
+                )
+    results = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages)) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dependency in results for dependency in stage.requires):
+                    del pending[name]
+                    running[pool.submit(stage.fn, dict(results))] = name
+            if not running:
+                raise ValueError(
+                    "Stages have circular requirements: " + ", ".join(pending)
+                )
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+
+class LLMPool:
+    """Hands every ``invoke`` to whichever model instance is free.
+
+    Model instances are not thread-safe, so each one serves a single
+    request at a time; with one instance the pool acts as a lock.
+    """
+
+    def __init__(self, instances):
+        self.size = len(instances)
+        # Tokenizing doesn't touch the model state, any instance will do.
+        self._tokenizer = instances[0]
+        self._free = Queue()
+        for instance in instances:
+            self._free.put(instance)
+
+    @contextmanager
+    def acquire(self):
+        instance = self._free.get()
+        try:
+            yield instance
+        finally:
+            self._free.put(instance)
+
+    def invoke(self, prompt, profile=None):
+        with self.acquire() as instance:
+            return instance.invoke(prompt, profile)
+
+    def stream(self, prompt, profile=None):
+        with self.acquire() as instance:
+            yield from instance.stream(prompt, profile)
+
+    def count_tokens(self, text):
+        return count_tokens(self._tokenizer, text)
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+
+
+class PrefixCachedLlama:
+    """GGUF model run through llama-cpp-python that caches prompt prefixes.
+
+    Every prompt is split at the last ``turn_marker`` into the constant
+    few-shot preamble and the variable request tail. The preamble is
+    evaluated once and the model state right after it is snapshotted;
+    later prompts with the same preamble restore that snapshot, so only
+    the tail tokens go through prompt evaluation.
+    """
+
+    def __init__(
+        self,
+        model_path,
+        turn_marker,
+        gpu_layers=0,
+        config=None,
+        max_prefixes=8,
+        constrained=False
+    ):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise ImportError(
+                "The prefix cache needs llama-cpp-python, install it with: pip install llama-cpp-python"  # nopep8
+            )
+        config = config or {}
+        self.config = config
+        self.model = Llama(
+            model_path=model_path,
+            n_ctx=config.get("context_length", 4096),
+            n_gpu_layers=gpu_layers,
+            n_threads=config.get("threads"),
+            verbose=False,
+        )
+        self.turn_marker = turn_marker
+        self.constrained = constrained
+        self._grammars = {}
+        self.max_prefixes = max_prefixes
+        self.enabled = True
+        self.completion_args = self._completion_args(config)
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _completion_args(config):
+        return {
+            "max_tokens": config.get("max_new_tokens", 1024),
+            "temperature": config.get("temperature", 0.8),
+            "top_k": config.get("top_k", 40),
+            "top_p": config.get("top_p", 0.95),
+            "repeat_penalty": config.get("repetition_penalty", 1.1),
+            "stop": config.get("stop", []),
+            "seed": config.get("seed"),
+        }
+
+    def _grammar(self, grammar):
+        if grammar.gbnf not in self._grammars:
+            from llama_cpp import LlamaGrammar
+            self._grammars[grammar.gbnf] = LlamaGrammar.from_string(
+                grammar.gbnf, verbose=False
+            )
+        return self._grammars[grammar.gbnf]
+
+    def split_prompt(self, prompt):
+        index = prompt.rfind(self.turn_marker)
+        if index <= 0:
+            return "", prompt
+        return prompt[:index], prompt[index:]
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+    def _restore_prefix(self, prefix):
+        state = self._states.get(prefix)
+        if state is not None:
+            self._states.move_to_end(prefix)
+            self.model.load_state(state)
+            return
+        self.model.reset()
+        self.model.eval(self.model.tokenize(prefix.encode("utf-8")))
+        self._states[prefix] = self.model.save_state()
+        while len(self._states) > self.max_prefixes:
+            self._states.popitem(last=False)
+
+    def stream(self, prompt, profile=None):
+        completion_args = (
+            self._completion_args(profile.apply(self.config))
+            if profile
+            else self.completion_args
+        )
+        if self.constrained and profile and profile.grammar is not None:
+            completion_args["grammar"] = self._grammar(profile.grammar)
+        with self._lock:
+            prefix, _ = self.split_prompt(prompt)
+            if self.enabled and prefix:
+                self._restore_prefix(prefix)
+            else:
+                self.model.reset()
+            # llama-cpp skips every leading token that is already in the
+            # restored context, so only the tail is evaluated here.
+            for chunk in self.model.create_completion(
+                prompt, stream=True, **completion_args
+            ):
+                yield chunk["choices"][0]["text"]
+
+    def invoke(self, prompt, profile=None):
+        return "".join(self.stream(prompt, profile))
+
+    def count_tokens(self, text):
+        return len(self.model.tokenize(text.encode("utf-8"), add_bos=False))
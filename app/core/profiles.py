@@ -0,0 +1,116 @@
+import os
+
+from core.prompts import mistral, zephyr
+
+MODELS_DIR = "models"
+
+
+class ModelProfile:
+    """Everything the front ends need to know about one GGUF model.
+
+    ``chat_template`` wraps a request in the model's turn markers, its
+    ``{message}`` field is replaced with the request text. ``prompts`` is
+    the module holding the few-shot ``EXAMPLES`` and one request builder
+    per generation stage.
+    """
+
+    def __init__(
+        self,
+        name,
+        title,
+        url,
+        chat_template,
+        stop,
+        prompts,
+        context_length=8192,
+        model_type="mistral",
+    ):
+        self.name = name
+        self.title = title
+        self.url = url
+        self.chat_template = chat_template
+        self.stop = list(stop)
+        self.prompts = prompts
+        self.context_length = context_length
+        self.model_type = model_type
+
+    @property
+    def filename(self):
+        return self.url.rsplit("/", 1)[-1]
+
+    @property
+    def model_path(self):
+        return os.path.join(MODELS_DIR, self.filename)
+
+    @property
+    def turn_marker(self):
+        """Text that starts every turn, where the few-shot prefix ends."""
+        return self.chat_template.split("{message}")[0].rstrip(" ")
+
+    def prompt(self, stage, **fields):
+        message = getattr(self.prompts, stage)(**fields)
+        return self.prompts.EXAMPLES[stage] + self.chat_template.format(
+            message=message
+        )
+
+    def quantized(self, quantization):
+        """Return this profile for another quantization of the same model."""
+        current = self.filename.rsplit(".", 2)[-2]
+        return ModelProfile(
+            f"{self.name}-{quantization.lower()}",
+            f"{self.title} ({quantization})",
+            self.url.replace(current, quantization),
+            self.chat_template,
+            self.stop,
+            self.prompts,
+            context_length=self.context_length,
+            model_type=self.model_type,
+        )
+
+
+PROFILES = {}
+
+
+def register_profile(profile):
+    PROFILES[profile.name] = profile
+    return profile
+
+
+def get_profile(name):
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown model profile '{name}', choose one of: "
+            + ", ".join(sorted(PROFILES))
+        )
+    return PROFILES[name]
+
+
+for _profile in (
+    ModelProfile(
+        "zephyr",
+        "Zephyr 7b Beta",
+        "https://huggingface.co/TheBloke/zephyr-7B-beta-GGUF/resolve/main/zephyr-7b-beta.Q4_K_M.gguf",  # nopep8
+        chat_template="\n<|user|> {message} </s>\n<|assistant|> ",
+        stop=(
+            "/s",
+            "</s>",
+            "<s>",
+            "<|system|>",
+            "<|assistant|>",
+            "<|user|>",
+            "<|char|>",
+        ),
+        prompts=zephyr,
+    ),
+    ModelProfile(
+        "mistral",
+        "Mistral 7b instruct 0.1",
+        "https://huggingface.co/TheBloke/Mistral-7B-Instruct-v0.1-GGUF/resolve/main/mistral-7b-instruct-v0.1.Q4_K_M.gguf",  # nopep8
+        chat_template="\n[INST] {message} [/INST]\n",
+        stop=("/s", "</s>", "<s>", "[INST]", "[/INST]", "<|im_end|>"),
+        prompts=mistral,
+    ),
+):
+    register_profile(_profile)
+    for _quantization in ("Q5_K_M", "Q8_0"):
+        register_profile(_profile.quantized(_quantization))
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "cache/llm_responses.sqlite3"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ResponseCache:
+    """On-disk LLM response cache with a least-recently-used size cap."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used "
+            "ON responses (last_used)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(prompt, model, config):
+        payload = json.dumps(
+            {"prompt": prompt, "model": model, "config": config},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._db.commit()
+            return row[0]
+
+    def put(self, key, response):
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_used"
+        )
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+
+class CachedLLM:
+    """Serves repeated prompts from a ``ResponseCache``.
+
+    ``model`` and ``config``, with the stage's settings and seed applied,
+    are part of the cache key, so a different model file, sampling setup
+    or seed never gets a stale answer. With ``bypass`` set, lookups are
+    skipped but fresh results are still stored.
+    """
+
+    def __init__(self, llm, cache, model, config, bypass=False):
+        self.llm = llm
+        self.cache = cache
+        self.model = model
+        self.config = config
+        self.bypass = bypass
+
+    def bypassed(self):
+        return CachedLLM(
+            self.llm,
+            self.cache,
+            self.model,
+            self.config,
+            bypass=True,
+        )
+
+    def _key(self, prompt, profile=None):
+        config = profile.apply(self.config) if profile else self.config
+        return ResponseCache.make_key(prompt, self.model, config)
+
+    def invoke(self, prompt, profile=None):
+        key = self._key(prompt, profile)
+        if not self.bypass:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        output = self.llm.invoke(prompt, profile)
+        self.cache.put(key, output)
+        return output
+
+    def count_tokens(self, text):
+        from core.instrumentation import count_tokens
+
+        return count_tokens(self.llm, text)
+
+    def stream(self, prompt, profile=None):
+        key = self._key(prompt, profile)
+        if not self.bypass:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        pieces = []
+        for piece in self.llm.stream(prompt, profile):
+            pieces.append(piece)
+            yield piece
+        self.cache.put(key, "".join(pieces))
@@ -0,0 +1,866 @@
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import aichar
+import gradio as gr
+from PIL import Image
+
+from core.generation import (
+    derive_seed,
+    generate_field,
+    new_master_seed,
+    stream_field,
+)
+from core.image_engine import (
+    HUB_MODEL,
+    add_sd_arguments,
+    create_image_engine,
+    render_avatar,
+    sd_options,
+)
+from core.instrumentation import (
+    CharacterStats,
+    add_timing_arguments,
+    configure_timing_log,
+)
+from core.llm import add_llm_arguments, load_llm
+from core.metrics import WebUIMetrics
+from core.profiles import get_profile
+from core.response_cache import CachedLLM
+
+CHARACTERS_DIR = "characters"
+MAX_TRACKED_CHARACTERS = 256
+
+args = None
+profile = None
+llm = None
+engine = None
+metrics = None
+models_ready = Future()
+model_status = "Loading models..."
+character_stats = OrderedDict()
+character_stats_lock = threading.Lock()
+
+
+def load_models():
+    global llm
+    set_model_status("Loading Stable Diffusion...")
+    engine.load()
+    set_model_status("Loading the LLM...")
+    llm = load_llm(args, profile, set_status=set_model_status)
+
+
+def parse_args(default_profile):
+    parser = argparse.ArgumentParser(
+        description="Character Factory WebUI"
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        help="Maximum number of LLM requests processed at once (defaults to --llm-instances)",  # nopep8
+    )
+    parser.add_argument(
+        "--sd-concurrency",
+        type=int,
+        default=1,
+        help="Maximum number of avatar requests processed at once",
+    )
+    parser.add_argument(
+        "--max-queue-size",
+        type=int,
+        default=64,
+        help="Reject new requests while this many are already waiting in the queue",  # nopep8
+    )
+    add_sd_arguments(parser)
+    add_llm_arguments(parser, default_profile)
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Serve Prometheus metrics (requests and latency per button, queue depth, LLM tokens, rendered images, model residency and memory) at /metrics (requires prometheus-client)",  # nopep8
+    )
+    add_timing_arguments(parser)
+    return parser.parse_args()
+
+
+def set_model_status(status):
+    global model_status
+    model_status = status
+
+
+def model_status_text():
+    return f"**Model status:** {model_status}"
+
+
+def load_models_in_background():
+    try:
+        load_models()
+    except Exception as e:
+        set_model_status(f"loading failed: {str(e)}")
+        models_ready.set_exception(e)
+    else:
+        set_model_status("ready")
+        models_ready.set_result(None)
+
+
+def wait_for_models():
+    if not models_ready.done():
+        gr.Info("Models are still loading, your request will start as soon as they are ready")  # nopep8
+    try:
+        models_ready.result()
+    except Exception as e:
+        raise gr.Error(f"Models failed to load: {str(e)}")
+
+
+def llm_for_request(bypass_cache):
+    if bypass_cache and isinstance(llm, CachedLLM):
+        return llm.bypassed()
+    return llm
+
+
+def stage_seed(seed, stage, pin_seed=False):
+    """Seed of ``stage`` for one click of its button.
+
+    With the seed pinned, it is derived from the character seed of the UI,
+    so the same seed gives the same output; otherwise every click rolls
+    a new one.
+    """
+    if seed is None:
+        return None
+    if not pin_seed:
+        return new_master_seed()
+    return derive_seed(int(seed), stage)
+
+
+def stats_for_character(seed):
+    """Timing records of the character with this seed, if they are logged.
+
+    Every field of a character is generated by its own request, the seed
+    is what they have in common.
+    """
+    if args.timing_log is None or seed is None:
+        return None
+    seed = int(seed)
+    with character_stats_lock:
+        stats = character_stats.get(seed)
+        if stats is None:
+            stats = character_stats[seed] = CharacterStats(seed)
+            while len(character_stats) > MAX_TRACKED_CHARACTERS:
+                character_stats.popitem(last=False)
+        return stats
+
+
+def log_character_stats(name, seed):
+    """Log the summary of the character once it is exported.
+
+    The records are dropped then, so a character generated and exported
+    again with the same seed is summed up on its own.
+    """
+    if args.timing_log is None or seed is None:
+        return
+    with character_stats_lock:
+        stats = character_stats.pop(int(seed), None)
+    if stats is not None:
+        stats.log(name=name, seed=int(seed), model_profile=profile.name)
+
+
+def stream_character_field(stage, bypass_cache, seed, pin_seed, **fields):
+    wait_for_models()
+    output = ""
+    for output in stream_field(
+        llm_for_request(bypass_cache),
+        profile,
+        stage,
+        stage_seed(seed, stage, pin_seed),
+        stats_for_character(seed),
+        **fields,
+    ):
+        yield output
+    print(output)
+
+
+def generate_character_name(
+    topic,
+    gender,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+):
+    yield from stream_character_field(
+        "name",
+        bypass_cache,
+        seed,
+        pin_seed,
+        topic=topic,
+        gender=input_none(gender),
+    )
+
+
+def generate_character_summary(
+    character_name,
+    topic,
+    gender,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+):
+    yield from stream_character_field(
+        "summary",
+        bypass_cache,
+        seed,
+        pin_seed,
+        name=character_name,
+        topic=topic,
+        gender=input_none(gender),
+    )
+
+
+def generate_character_personality(
+    character_name,
+    character_summary,
+    topic,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+):
+    yield from stream_character_field(
+        "personality",
+        bypass_cache,
+        seed,
+        pin_seed,
+        name=character_name,
+        summary=character_summary,
+        topic=topic,
+    )
+
+
+def generate_character_scenario(
+    character_summary,
+    character_personality,
+    topic,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+):
+    yield from stream_character_field(
+        "scenario",
+        bypass_cache,
+        seed,
+        pin_seed,
+        summary=character_summary,
+        personality=character_personality,
+        topic=topic,
+    )
+
+
+def generate_character_greeting_message(
+    character_name,
+    character_summary,
+    character_personality,
+    topic,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+):
+    yield from stream_character_field(
+        "greeting_message",
+        bypass_cache,
+        seed,
+        pin_seed,
+        name=character_name,
+        summary=character_summary,
+        personality=character_personality,
+        topic=topic,
+    )
+
+
+def generate_example_messages(
+    character_name,
+    character_summary,
+    character_personality,
+    topic,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+):
+    yield from stream_character_field(
+        "example_messages",
+        bypass_cache,
+        seed,
+        pin_seed,
+        name=character_name,
+        summary=character_summary,
+        personality=character_personality,
+        topic=topic,
+    )
+
+
+def generate_character_avatar(
+    character_name,
+    character_summary,
+    topic,
+    negative_prompt,
+    avatar_prompt,
+    nsfw_filter,
+    num_candidates=1,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+    preview=False,
+    avatar_seed=None,
+):
+    wait_for_models()
+    sd_prompt = input_none(avatar_prompt) or generate_field(
+        llm_for_request(bypass_cache),
+        profile,
+        "avatar_prompt",
+        stage_seed(seed, "avatar_prompt", pin_seed),
+        stats_for_character(seed),
+        summary=character_summary,
+        topic=topic,
+    )
+    print(sd_prompt)
+    if avatar_seed is None:
+        avatar_seed = stage_seed(seed, "avatar", pin_seed)
+    images, avatar_seed = render_avatar(
+        engine,
+        character_name,
+        sd_prompt,
+        input_none(negative_prompt),
+        output_dir=CHARACTERS_DIR,
+        nsfw_filter=nsfw_filter,
+        num_candidates=int(num_candidates),
+        seed=avatar_seed,
+        preview=preview,
+        stats=stats_for_character(seed),
+    )
+    # The prompt and the seed are kept so the final render can reuse them.
+    return images[0], images, sd_prompt, avatar_seed
+
+
+def preview_character_avatar(
+    character_name,
+    character_summary,
+    topic,
+    negative_prompt,
+    avatar_prompt,
+    nsfw_filter,
+    num_candidates=1,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+):
+    return generate_character_avatar(
+        character_name,
+        character_summary,
+        topic,
+        negative_prompt,
+        avatar_prompt,
+        nsfw_filter,
+        num_candidates,
+        bypass_cache,
+        seed,
+        pin_seed,
+        preview=True,
+    )
+
+
+def final_character_avatar(
+    character_name,
+    character_summary,
+    topic,
+    negative_prompt,
+    avatar_prompt,
+    nsfw_filter,
+    num_candidates=1,
+    bypass_cache=False,
+    seed=None,
+    pin_seed=False,
+    preview_seed=None,
+):
+    """Render the avatar at full quality with the seed of the preview."""
+    return generate_character_avatar(
+        character_name,
+        character_summary,
+        topic,
+        negative_prompt,
+        avatar_prompt,
+        nsfw_filter,
+        num_candidates,
+        bypass_cache,
+        seed,
+        pin_seed,
+        avatar_seed=preview_seed,
+    )
+
+
+def select_avatar_candidate(character_name, candidates, evt: gr.SelectData):
+    """Make the clicked gallery candidate the character's avatar."""
+    if not input_none(character_name):
+        raise gr.Error("Set the character name first")
+    # Gallery items come with their caption.
+    image, _ = candidates[evt.index]
+    character_name = character_name.replace(" ", "_")
+    os.makedirs(f"{CHARACTERS_DIR}/{character_name}", exist_ok=True)
+    image.save(f"{CHARACTERS_DIR}/{character_name}/{character_name}.png")
+    return image
+
+
+def input_none(text):
+    user_input = text
+    if user_input == "":
+        return None
+    else:
+        return user_input
+
+
+"""## Start WebUI"""
+
+
+def import_character_json(json_path):
+    print(json_path)
+    if json_path is not None:
+        character = aichar.load_character_json_file(json_path)
+        if character.name:
+            gr.Info("Character data loaded successfully")
+            return (
+                character.name,
+                character.summary,
+                character.personality,
+                character.scenario,
+                character.greeting_message,
+                character.example_messages,
+            )
+        raise ValueError("Error when importing character data from a JSON file. Validate the file. Check the file for correctness and try again")  # nopep8
+
+
+def import_character_card(card_path):
+    print(card_path)
+    if card_path is not None:
+        character = aichar.load_character_card_file(card_path)
+        if character.name:
+            gr.Info("Character data loaded successfully")
+            return (
+                character.name,
+                character.summary,
+                character.personality,
+                character.scenario,
+                character.greeting_message,
+                character.example_messages,
+            )
+        raise ValueError("Error when importing character data from a character card file. Check the file for correctness and try again")  # nopep8
+
+
+def export_as_json(
+    name,
+    summary,
+    personality,
+    scenario,
+    greeting_message,
+    example_messages,
+    seed=None,
+    pin_seed=False,
+):
+    log_character_stats(name, seed)
+    character = aichar.create_character(
+        name=name,
+        summary=summary,
+        personality=personality,
+        scenario=scenario,
+        greeting_message=greeting_message,
+        example_messages=example_messages,
+        image_path="",
+    )
+    data = json.loads(character.export_neutral_json())
+    # Only a pinned seed reproduces the character.
+    if seed is not None and pin_seed:
+        data["metadata"] = {"seed": int(seed), "model_profile": profile.name}
+    return data
+
+
+def export_character_card(
+    name,
+    summary,
+    personality,
+    scenario,
+    greeting_message,
+    example_messages,
+    seed=None,
+    pin_seed=False,
+):
+    log_character_stats(name, seed)
+    character_name = name.replace(" ", "_")
+    base_path = f"{CHARACTERS_DIR}/{character_name}/"
+    character = aichar.create_character(
+        name=name,
+        summary=summary,
+        personality=personality,
+        scenario=scenario,
+        greeting_message=greeting_message,
+        example_messages=example_messages,
+        image_path=f"{base_path}{character_name}.png",
+    )
+    character_name = character.name.replace(" ", "_")
+    card_path = f"{base_path}{character_name}.card.png"
+    character.export_neutral_card_file(card_path)
+    return Image.open(card_path)
+
+
+def tracked(handler, fn):
+    return metrics.track(handler, fn) if metrics is not None else fn
+
+
+def queue_depth(webui):
+    # Gradio keeps its queue private, it may not be there in every version.
+    try:
+        return len(webui._queue)
+    except Exception:
+        return 0
+
+
+def build_webui():
+    llm_concurrency = args.llm_concurrency or args.llm_instances
+
+    with gr.Blocks() as webui:
+        gr.Markdown("# Character Factory WebUI")
+        gr.Markdown(f"## Model: {profile.title}")
+        gr.Markdown(model_status_text, every=2)
+        with gr.Tab("Edit character"):
+            gr.Markdown(
+                "## Hint: If you want to generate the entire character using LLM and Stable Diffusion, start from the top to bottom"  # nopep8
+            )
+            topic = gr.Textbox(
+                placeholder="Topic: The topic for character generation (e.g., Fantasy, Anime, etc.)",  # nopep8
+                label="topic",
+            )
+            gender = gr.Textbox(
+                placeholder="Gender: Gender of the character", label="gender"
+            )
+            bypass_cache = gr.Checkbox(
+                label="Generate fresh text instead of reusing cached LLM responses",  # nopep8
+                value=False,
+                visible=bool(args.llm_cache),
+            )
+            with gr.Row():
+                seed = gr.Number(
+                    value=new_master_seed,
+                    precision=0,
+                    label="seed (with the seed kept, every field and the avatar derive their own seed from it and the same seed reproduces a character)",  # nopep8
+                )
+                pin_seed = gr.Checkbox(
+                    label="Keep the seed (otherwise every click generates something new)",  # nopep8
+                    value=False,
+                )
+                new_seed_button = gr.Button("New random seed")
+                new_seed_button.click(new_master_seed, outputs=seed)
+            with gr.Column():
+                with gr.Row():
+                    name = gr.Textbox(placeholder="character name", label="name")  # nopep8
+                    name_button = gr.Button("Generate character name with LLM")
+                    name_button.click(
+                        tracked("name", generate_character_name),
+                        inputs=[topic, gender, bypass_cache, seed, pin_seed],
+                        outputs=name,
+                        concurrency_limit=llm_concurrency,
+                        concurrency_id="llm",
+                    )
+                with gr.Row():
+                    summary = gr.Textbox(
+                        placeholder="character summary",
+                        label="summary"
+                    )
+                    summary_button = gr.Button("Generate character summary with LLM")  # nopep8
+                    summary_button.click(
+                        tracked("summary", generate_character_summary),
+                        inputs=[name, topic, gender, bypass_cache, seed, pin_seed],  # nopep8
+                        outputs=summary,
+                        concurrency_limit=llm_concurrency,
+                        concurrency_id="llm",
+                    )
+                with gr.Row():
+                    personality = gr.Textbox(
+                        placeholder="character personality", label="personality"  # nopep8
+                    )
+                    personality_button = gr.Button(
+                        "Generate character personality with LLM"
+                    )
+                    personality_button.click(
+                        tracked("personality", generate_character_personality),
+                        inputs=[name, summary, topic, bypass_cache, seed, pin_seed],  # nopep8
+                        outputs=personality,
+                        concurrency_limit=llm_concurrency,
+                        concurrency_id="llm",
+                    )
+                with gr.Row():
+                    scenario = gr.Textbox(
+                        placeholder="character scenario",
+                        label="scenario"
+                    )
+                    scenario_button = gr.Button("Generate character scenario with LLM")  # nopep8
+                    scenario_button.click(
+                        tracked("scenario", generate_character_scenario),
+                        inputs=[summary, personality, topic, bypass_cache, seed, pin_seed],  # nopep8
+                        outputs=scenario,
+                        concurrency_limit=llm_concurrency,
+                        concurrency_id="llm",
+                    )
+                with gr.Row():
+                    greeting_message = gr.Textbox(
+                        placeholder="character greeting message",
+                        label="greeting message"
+                    )
+                    greeting_message_button = gr.Button(
+                        "Generate character greeting message with LLM"
+                    )
+                    greeting_message_button.click(
+                        tracked(
+                            "greeting", generate_character_greeting_message
+                        ),
+                        inputs=[
+                            name,
+                            summary,
+                            personality,
+                            topic,
+                            bypass_cache,
+                            seed,
+                            pin_seed,
+                        ],
+                        outputs=greeting_message,
+                        concurrency_limit=llm_concurrency,
+                        concurrency_id="llm",
+                    )
+                with gr.Row():
+                    example_messages = gr.Textbox(
+                        placeholder="character example messages",
+                        label="example messages"
+                    )
+                    example_messages_button = gr.Button(
+                        "Generate character example messages with LLM"
+                    )
+                    example_messages_button.click(
+                        tracked("examples", generate_example_messages),
+                        inputs=[
+                            name,
+                            summary,
+                            personality,
+                            topic,
+                            bypass_cache,
+                            seed,
+                            pin_seed,
+                        ],
+                        outputs=example_messages,
+                        concurrency_limit=llm_concurrency,
+                        concurrency_id="llm",
+                    )
+                with gr.Row():
+                    with gr.Column():
+                        image_input = gr.Image(width=512, height=512)
+                        avatar_candidates = gr.Gallery(
+                            label="avatar candidates", columns=4, type="pil"
+                        )
+                    with gr.Column():
+                        negative_prompt = gr.Textbox(
+                            placeholder="negative prompt for stable diffusion (optional)",  # nopep8
+                            label="negative prompt",
+                        )
+                        avatar_prompt = gr.Textbox(
+                            placeholder="prompt for generating character avatar (If not provided, LLM will generate prompt from character description)",  # nopep8
+                            label="stable diffusion prompt",
+                        )
+                        avatar_button = gr.Button(
+                            "Generate avatar with stable diffusion (set character name first)"  # nopep8
+                        )
+                        with gr.Row():
+                            preview_button = gr.Button(
+                                "Quick avatar preview (few steps, tiny autoencoder)"  # nopep8
+                            )
+                            final_button = gr.Button(
+                                "Render final avatar from the preview"
+                            )
+                        potential_nsfw_checkbox = gr.Checkbox(
+                            label="Block potential NSFW image (Upon detection of this content, a black image will be returned)",  # nopep8
+                            value=True,
+                            interactive=True,
+                        )
+                        num_candidates = gr.Slider(
+                            minimum=1,
+                            maximum=8,
+                            value=1,
+                            step=1,
+                            label="Avatar candidates (rendered in one batch, click one in the gallery to use it)",  # nopep8
+                        )
+                        # Seed of the last avatar, for the final render.
+                        avatar_seed = gr.State()
+                        avatar_outputs = [
+                            image_input,
+                            avatar_candidates,
+                            avatar_prompt,
+                            avatar_seed,
+                        ]
+                        avatar_button.click(
+                            tracked("avatar", generate_character_avatar),
+                            inputs=[
+                                name,
+                                summary,
+                                topic,
+                                negative_prompt,
+                                avatar_prompt,
+                                potential_nsfw_checkbox,
+                                num_candidates,
+                                bypass_cache,
+                                seed,
+                                pin_seed,
+                            ],
+                            outputs=avatar_outputs,
+                            concurrency_limit=args.sd_concurrency,
+                            concurrency_id="sd",
+                        )
+                        preview_button.click(
+                            tracked("avatar_preview", preview_character_avatar),  # nopep8
+                            inputs=[
+                                name,
+                                summary,
+                                topic,
+                                negative_prompt,
+                                avatar_prompt,
+                                potential_nsfw_checkbox,
+                                num_candidates,
+                                bypass_cache,
+                                seed,
+                                pin_seed,
+                            ],
+                            outputs=avatar_outputs,
+                            concurrency_limit=args.sd_concurrency,
+                            concurrency_id="sd",
+                        )
+                        # Same seed and prompt as the preview, at full quality.
+                        final_button.click(
+                            tracked("avatar", final_character_avatar),
+                            inputs=[
+                                name,
+                                summary,
+                                topic,
+                                negative_prompt,
+                                avatar_prompt,
+                                potential_nsfw_checkbox,
+                                num_candidates,
+                                bypass_cache,
+                                seed,
+                                pin_seed,
+                                avatar_seed,
+                            ],
+                            outputs=avatar_outputs,
+                            concurrency_limit=args.sd_concurrency,
+                            concurrency_id="sd",
+                        )
+                        avatar_candidates.select(
+                            select_avatar_candidate,
+                            inputs=[name, avatar_candidates],
+                            outputs=image_input,
+                        )
+        with gr.Tab("Import character"):
+            with gr.Column():
+                with gr.Row():
+                    import_card_input = gr.File(
+                        label="Upload character card file", file_types=[".png"]
+                    )
+                    import_json_input = gr.File(
+                        label="Upload JSON file", file_types=[".json"]
+                    )
+                with gr.Row():
+                    import_card_button = gr.Button("Import character from character card")  # nopep8
+                    import_json_button = gr.Button("Import character from json")  # nopep8
+
+                import_card_button.click(
+                    tracked("import_card", import_character_card),
+                    inputs=[import_card_input],
+                    outputs=[
+                        name,
+                        summary,
+                        personality,
+                        scenario,
+                        greeting_message,
+                        example_messages,
+                    ],
+                )
+                import_json_button.click(
+                    tracked("import_json", import_character_json),
+                    inputs=[import_json_input],
+                    outputs=[
+                        name,
+                        summary,
+                        personality,
+                        scenario,
+                        greeting_message,
+                        example_messages,
+                    ],
+                )
+        with gr.Tab("Export character"):
+            with gr.Column():
+                with gr.Row():
+                    export_image = gr.Image(width=512, height=512)
+                    export_json_textbox = gr.JSON()
+
+                with gr.Row():
+                    export_card_button = gr.Button("Export as character card")
+                    export_json_button = gr.Button("Export as JSON")
+
+                    export_card_button.click(
+                        tracked("export_card", export_character_card),
+                        inputs=[
+                            name,
+                            summary,
+                            personality,
+                            scenario,
+                            greeting_message,
+                            example_messages,
+                            seed,
+                            pin_seed,
+                        ],
+                        outputs=export_image,
+                    )
+                    export_json_button.click(
+                        tracked("export_json", export_as_json),
+                        inputs=[
+                            name,
+                            summary,
+                            personality,
+                            scenario,
+                            greeting_message,
+                            example_messages,
+                            seed,
+                            pin_seed,
+                        ],
+                        outputs=export_json_textbox,
+                    )
+        gr.HTML("""<div style='text-align: center; font-size: 20px;'>
+        <p>
+          <a style="text-decoration: none; color: inherit;" href="https://github.com/Hukasx0/character-factory">Character Factory</a>
+          by
+          <a style="text-decoration: none; color: inherit;" href="https://github.com/Hukasx0">Hubert "Hukasx0" Kasperek</a>
+        </p>
+      </div>""")  # nopep8
+    return webui
+
+
+def main(default_profile):
+    global args, profile, engine, metrics
+    args = parse_args(default_profile)
+    profile = get_profile(args.model_profile)
+    configure_timing_log(args.timing_log)
+    engine = create_image_engine(HUB_MODEL, options=sd_options(args))
+    if args.metrics:
+        metrics = WebUIMetrics()
+        metrics.watch_model("llm", lambda: llm is not None)
+        metrics.watch_model("stable-diffusion", lambda: engine.loaded)
+    threading.Thread(target=load_models_in_background, daemon=True).start()
+    webui = build_webui()
+    webui.queue(max_size=args.max_queue_size)
+    webui.launch(debug=True, prevent_thread_lock=True)
+    if metrics is not None:
+        metrics.watch_queue(lambda: queue_depth(webui))
+        metrics.add_route(webui.app)
+    webui.block_thread()
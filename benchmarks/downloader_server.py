@@ -0,0 +1,169 @@
+"""The model downloader against a local stand-in for the model host.
+
+An ``http.server`` serves a random model file, with or without support
+for range requests, and can cut the connection in the middle of a
+response. Every case downloads the file with ``ensure_model`` into a
+temporary directory and checks its content and what was requested:
+
+  ranged          parallel range requests
+  no range        the server ignores Range, one plain GET
+  interrupted     connections cut mid-range are resumed where they stopped
+  resume          a truncated file is completed, not downloaded again
+  corrupted       a file of the right size but wrong content is replaced
+  verified        an unchanged verified file is accepted without a request
+
+    python benchmarks/downloader_server.py
+"""
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from core import downloader  # noqa: E402
+
+# Big enough for several ranges of CHUNK_SIZE.
+MODEL = os.urandom(3 * downloader.CHUNK_SIZE + 12345)
+FILENAME = "model.gguf"
+
+
+class ModelHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    accept_ranges = True
+    # Number of responses to cut after half of their body.
+    cuts = 0
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match and self.accept_ranges:
+            start = int(match.group(1))
+            end = int(match.group(2) or len(MODEL) - 1)
+            body = MODEL[start:end + 1]
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{len(MODEL)}"
+            )
+        else:
+            start, body = 0, MODEL
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        with self.lock:
+            type(self).requests.append((start, len(body)))
+            cut = type(self).cuts > 0 and len(body) > 1
+            if cut:
+                type(self).cuts -= 1
+        if cut:
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def reset(accept_ranges=True, cuts=0):
+    ModelHandler.accept_ranges = accept_ranges
+    ModelHandler.cuts = cuts
+    ModelHandler.requests = []
+
+
+def downloaded(folder):
+    with open(os.path.join(folder, FILENAME), "rb") as f:
+        return f.read() == MODEL
+
+
+def ranged(url, folder):
+    reset()
+    downloader.ensure_model(url, folder)
+    # The probe plus one request per range.
+    return downloaded(folder) and len(ModelHandler.requests) > 2
+
+
+def no_range(url, folder):
+    reset(accept_ranges=False)
+    downloader.ensure_model(url, folder)
+    return downloaded(folder) and len(ModelHandler.requests) == 2
+
+
+def interrupted(url, folder):
+    reset(cuts=2)
+    downloader.ensure_model(url, folder)
+    fetched = sum(size for start, size in ModelHandler.requests if start)
+    # The cut ranges are only asked for what is missing.
+    return downloaded(folder) and fetched < 2 * len(MODEL)
+
+
+def resume(url, folder):
+    with open(os.path.join(folder, FILENAME), "wb") as f:
+        f.write(MODEL[:len(MODEL) // 3])
+    reset()
+    downloader.ensure_model(url, folder)
+    # Probes ask for a single byte.
+    starts = [start for start, size in ModelHandler.requests if size > 1]
+    return downloaded(folder) and min(starts) >= len(MODEL) // 3
+
+
+def corrupted(url, folder):
+    downloader.ensure_model(url, folder)
+    path = os.path.join(folder, FILENAME)
+    with open(path, "r+b") as f:
+        f.seek(len(MODEL) // 2)
+        f.write(bytes([MODEL[len(MODEL) // 2] ^ 0xFF]))
+    reset()
+    downloader.ensure_model(url, folder)
+    return downloaded(folder) and len(ModelHandler.requests) > 1
+
+
+def verified(url, folder):
+    downloader.ensure_model(url, folder)
+    reset()
+    downloader.ensure_model(url, folder)
+    return downloaded(folder) and not ModelHandler.requests
+
+
+CASES = {
+    "ranged": ranged,
+    "no range": no_range,
+    "interrupted": interrupted,
+    "resume": resume,
+    "corrupted": corrupted,
+    "verified": verified,
+}
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ModelHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/{FILENAME}"
+    failed = False
+    try:
+        for name, case in CASES.items():
+            with tempfile.TemporaryDirectory() as folder:
+                # Progress bars and download messages.
+                output = io.StringIO()
+                try:
+                    with contextlib.redirect_stdout(output), \
+                            contextlib.redirect_stderr(output):
+                        status = "ok" if case(url, folder) else "FAIL"
+                except Exception as e:
+                    status = f"FAIL: {e!r}"
+            failed = failed or status != "ok"
+            print(f"{name:<14}{status}")
+    finally:
+        server.shutdown()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
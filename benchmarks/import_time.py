@@ -0,0 +1,88 @@
+"""Startup import cost of the entry scripts, measured with ``-X importtime``.
+
+Every script is started with ``--help``, so it imports its module-level
+dependencies, prints the usage and exits before any model is touched. The
+benchmark fails if a script imports a heavy library at startup that it is
+not allowed to, or if its startup imports take longer than ``--budget``.
+
+    python benchmarks/import_time.py --budget 2.0
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+HEAVY_MODULES = (
+    "torch",
+    "diffusers",
+    "transformers",
+    "accelerate",
+    "ctransformers",
+    "llama_cpp",
+    "gradio",
+)
+
+SCRIPTS = {
+    "app/main-zephyr.py": (),
+    "app/main-mistral.py": (),
+    "app/main-zephyr-webui.py": ("gradio",),
+    "app/main-mistral-webui.py": ("gradio",),
+}
+
+
+def import_times(script):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script, "--help"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} failed to start:\n{result.stderr}")
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            # Nested imports are indented after the separating space.
+            cumulative[name[1:].rstrip()] = int(cumulative_us)
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        help="Fail if the startup imports of a script take longer (seconds)",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for script, allowed in SCRIPTS.items():
+        cumulative = import_times(script)
+        # Top-level imports are the ones without indentation.
+        total = sum(
+            us for name, us in cumulative.items() if not name.startswith(" ")
+        ) / 1e6
+        heavy = sorted(
+            name.strip()
+            for name in cumulative
+            if name.strip() in HEAVY_MODULES and name.strip() not in allowed
+        )
+        status = "ok"
+        if heavy:
+            status = "imports " + ", ".join(heavy)
+            failed = True
+        elif args.budget is not None and total > args.budget:
+            status = f"over budget ({args.budget:.2f}s)"
+            failed = True
+        print(f"{script:<28}{total:>8.2f}s  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Prompt evaluation and decode speed of every generation stage with the
+real GGUF models.
+
+Every combination of model profile, thread count and GPU layers loads
+the model in its own process, so its peak RSS is measured on its own,
+and runs the prompt of every stage ``--runs`` times with the stage's
+token limit and stop strings. The time to the first token is reported
+as prompt evaluation, the rate of the following tokens as decode speed
+(both medians). The prefix cache is off, so the few-shot examples are
+evaluated on every run.
+
+The fields the later stages build on come from a character exported by
+the factory (``--character``, one of the examples by default), so their
+prompts are as long as the ones of a real run.
+
+    python benchmarks/llm_stages.py --runs 3 --threads 4 8
+    python benchmarks/llm_stages.py --model-profile zephyr-q8_0 --gpu-layers 0 20 110 --backend llama-cpp
+"""  # nopep8
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from core.downloader import ensure_model  # noqa: E402
+from core.generation import stage_profile  # noqa: E402
+from core.instrumentation import count_tokens  # noqa: E402
+from core.llm import llm_config  # noqa: E402
+from core.profiles import MODELS_DIR, PROFILES, get_profile  # noqa: E402
+
+BACKENDS = ("ctransformers", "llama-cpp")
+EXAMPLE_CHARACTER = os.path.join(
+    APP_DIR, "..", "examples", "Lily_Harper", "Lily_Harper.json"
+)
+
+
+def stage_prompts(profile, character_path, topic, gender):
+    """The prompt of every stage, filled with an exported character."""
+    with open(character_path, encoding="utf-8") as f:
+        character = json.load(f)
+    name = character["name"]
+    summary = character["description"]
+    personality = character["personality"]
+    fields = {
+        "name": dict(topic=topic, gender=gender),
+        "summary": dict(name=name, topic=topic, gender=gender),
+        "personality": dict(name=name, summary=summary, topic=topic),
+        "scenario": dict(
+            summary=summary, personality=personality, topic=topic
+        ),
+        "greeting_message": dict(
+            name=name, summary=summary, personality=personality, topic=topic
+        ),
+        "example_messages": dict(
+            name=name, summary=summary, personality=personality, topic=topic
+        ),
+        "avatar_prompt": dict(summary=summary, topic=topic),
+    }
+    return [
+        (stage, profile.prompt(stage, **stage_fields))
+        for stage, stage_fields in fields.items()
+    ]
+
+
+def load_backend(backend, profile, threads, gpu_layers):
+    config = llm_config(profile, gpu_layers)
+    config["threads"] = threads
+    if backend == "llama-cpp":
+        from core.prefix_cache import PrefixCachedLlama
+        llm = PrefixCachedLlama(
+            profile.model_path,
+            turn_marker=profile.turn_marker,
+            gpu_layers=gpu_layers,
+            config=config,
+        )
+        llm.enabled = False
+        return llm
+    from core.backends import CTransformersBackend
+    return CTransformersBackend(
+        profile.model_path,
+        model_type=profile.model_type,
+        gpu_layers=gpu_layers,
+        config=config,
+    )
+
+
+def run_stage(llm, stage, prompt, seed):
+    start = time.perf_counter()
+    first = None
+    tokens = 0
+    for _ in llm.stream(prompt, stage_profile(stage, seed)):
+        if first is None:
+            first = time.perf_counter()
+        tokens += 1
+    end = time.perf_counter()
+    if first is None:
+        return end - start, None
+    decode = (tokens - 1) / (end - first) if tokens > 1 else None
+    return first - start, decode
+
+
+def benchmark(backend, profile_name, threads, gpu_layers, runs, character):
+    """Load one model and time every stage, in a process of its own.
+
+    ``character`` holds the arguments of ``stage_prompts``.
+    """
+    profile = get_profile(profile_name)
+    start = time.perf_counter()
+    llm = load_backend(backend, profile, threads, gpu_layers)
+    load = time.perf_counter() - start
+    stages = []
+    for stage, prompt in stage_prompts(profile, *character):
+        prompt_eval = []
+        decode = []
+        for run in range(runs):
+            seconds, rate = run_stage(llm, stage, prompt, seed=run)
+            prompt_eval.append(seconds)
+            if rate is not None:
+                decode.append(rate)
+        stages.append((
+            stage,
+            count_tokens(llm, prompt),
+            statistics.median(prompt_eval),
+            statistics.median(decode) if decode else None,
+        ))
+    # Kilobytes on Linux.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return load, peak_rss, stages
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--model-profile",
+        nargs="+",
+        choices=sorted(PROFILES),
+        default=["zephyr", "mistral"],
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKENDS[0])
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[os.cpu_count() or 1],
+    )
+    parser.add_argument("--gpu-layers", type=int, nargs="+", default=[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--character",
+        default=EXAMPLE_CHARACTER,
+        help="JSON export of a character whose fields fill the prompts of the later stages",  # nopep8
+    )
+    parser.add_argument(
+        "--topic",
+        default="romance",
+        help="Topic of the prompts, the one the character was made with",
+    )
+    parser.add_argument("--gender", default="female")
+    args = parser.parse_args()
+
+    for profile_name in args.model_profile:
+        ensure_model(get_profile(profile_name).url, MODELS_DIR)
+
+    print(
+        f"{'profile':<20}{'threads':>8}{'gpu':>5}{'stage':>18}"
+        f"{'prompt tok':>12}{'prompt eval':>13}{'decode':>12}"
+    )
+    for profile_name in args.model_profile:
+        for threads in args.threads:
+            for gpu_layers in args.gpu_layers:
+                # A fresh process per model, so its peak RSS is its own.
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=get_context("spawn")
+                ) as pool:
+                    load, peak_rss, stages = pool.submit(
+                        benchmark,
+                        args.backend,
+                        profile_name,
+                        threads,
+                        gpu_layers,
+                        args.runs,
+                        (args.character, args.topic, args.gender),
+                    ).result()
+                for stage, tokens, prompt_eval, decode in stages:
+                    decode = f"{decode:.1f}t/s" if decode else "-"
+                    print(
+                        f"{profile_name:<20}{threads:>8}{gpu_layers:>5}"
+                        f"{stage:>18}{tokens:>12}{prompt_eval * 1000:>11.0f}ms"
+                        f"{decode:>12}"
+                    )
+                print(
+                    f"{profile_name:<20}{threads:>8}{gpu_layers:>5}"
+                    f"{'load':>18}{'':>12}{load * 1000:>11.0f}ms"
+                    f"   peak RSS {peak_rss:.0f} MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Character generation end to end with a fake LLM and fake diffusion.
+
+Runs the script's create_character -> export path without models, GPU
+or network, so it works on any CPU-only box, and reports per character:
+
+  scheduling     create_character with instant backends: the stage graph,
+                 prompt building and the hand-off to the image thread,
+                 which only renders once it returned
+  avatar         rendering the fake avatar and saving it as PNG
+  serialization  JSON and YAML export, including the seed metadata
+  card export    writing the character card PNG
+  batch          characters per second of a --batch run with the
+                 synthetic latencies below
+
+The fake LLM answers every prompt with --response-tokens words derived
+from the prompt (cut at each stage's token limit); the fake diffusion
+backend renders single-colour images. Everything is written to a
+temporary directory.
+
+With --smoke, nothing is timed: one character goes through the script's
+generate path and the run fails unless its JSON, YAML, avatar and card
+files were written.
+
+    python benchmarks/offline_pipeline.py
+    python benchmarks/offline_pipeline.py --smoke
+    python benchmarks/offline_pipeline.py --characters 10 --token-delay 0.01 --render-delay 0.5 --llm-batch-size 4
+"""  # nopep8
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from core import cli  # noqa: E402
+from core.backends import FakeBackend  # noqa: E402
+from core.image_engine import get_image_engine  # noqa: E402
+from core.metadata import add_json_metadata, add_yaml_metadata  # noqa: E402
+from core.pipeline import LLMPool  # noqa: E402
+from core.profiles import PROFILES, get_profile  # noqa: E402
+
+
+def fake_response(tokens):
+    def respond(prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return " ".join(
+            digest[i % 58:i % 58 + 6] for i in range(tokens)
+        )
+    return respond
+
+
+def fake_llm(args, token_delay, prompt_delay):
+    # Like a server, as many requests at once as load_llm allows.
+    return LLMPool([
+        FakeBackend(
+            fake_response(args.response_tokens),
+            token_delay=token_delay,
+            prompt_delay=prompt_delay,
+        )
+        for _ in range(max(args.llm_instances, args.llm_batch_size))
+    ])
+
+
+def character_args(args):
+    return cli.parse_args(args.model_profile, [
+        "--llm-backend", "fake",
+        "--sd-backend", "fake",
+        "--model-profile", args.model_profile,
+        "--llm-instances", str(args.llm_instances),
+        "--llm-batch-size", str(args.llm_batch_size),
+        "--seed", "0",
+    ])
+
+
+def rows(count):
+    # Different topics, so every character gets its own name and folder.
+    return [(line_no, {"topic": f"topic {line_no}"}) for line_no in range(1, count + 1)]  # nopep8
+
+
+def measure_steps(args, run_args, count):
+    """Seconds per character of every step but the batch run."""
+    cli.llm = fake_llm(args, 0.0, 0.0)
+    engine = get_image_engine()
+    engine.render_delay = 0.0
+    totals = {
+        "scheduling": 0.0,
+        "avatar": 0.0,
+        "serialization": 0.0,
+        "card export": 0.0,
+    }
+    for line_no, row in rows(count):
+        run_args.topic = row["topic"]
+        run_args.seed = line_no
+        # The image thread waits for the gate, so the avatar is neither
+        # rendered nor saved while create_character is timed.
+        gate = threading.Event()
+        engine.submit(gate.wait)
+        start = time.perf_counter()
+        character, avatar, metadata = cli.create_character(run_args)
+        totals["scheduling"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        gate.set()
+        avatar.result()
+        totals["avatar"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        character_name = character.name.replace(" ", "_")
+        os.makedirs(character_name, exist_ok=True)
+        character_path = f"{character_name}/{character_name}"
+        character.export_neutral_json_file(character_path + ".json")
+        character.export_neutral_yaml_file(character_path + ".yml")
+        add_json_metadata(character_path + ".json", metadata)
+        add_yaml_metadata(character_path + ".yml", metadata)
+        totals["serialization"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        cli.export_character_card(character, avatar)
+        totals["card export"] += time.perf_counter() - start
+    return {step: seconds / count for step, seconds in totals.items()}
+
+
+def measure_batch(args, run_args, count):
+    """Characters per second of a batch run with the synthetic latencies."""
+    cli.llm = fake_llm(args, args.token_delay, args.prompt_delay)
+    get_image_engine().render_delay = args.render_delay
+    run_args.topic = None
+    run_args.seed = 0
+    start = time.perf_counter()
+    cli.run_batch(run_args, rows(count))
+    return count / (time.perf_counter() - start)
+
+
+def smoke(args):
+    """Generate and export one character; the names of missing files."""
+    run_args = character_args(args)
+    run_args.topic = "topic 1"
+    cli.llm = fake_llm(args, 0.0, 0.0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cli.prepare_sd(run_args)
+        cli.generate_character(run_args).result()
+    folders = os.listdir()
+    if len(folders) != 1:
+        return [f"one character folder, found {folders}"]
+    character_path = os.path.join(folders[0], folders[0])
+    return [
+        character_path + suffix
+        for suffix in (".json", ".yml", ".png", ".card.png")
+        if not os.path.isfile(character_path + suffix)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--characters",
+        type=int,
+        nargs="+",
+        default=[1, 10, 1000],
+    )
+    parser.add_argument(
+        "--model-profile",
+        choices=sorted(PROFILES),
+        default="zephyr",
+    )
+    parser.add_argument(
+        "--response-tokens",
+        type=int,
+        default=64,
+        help="Words in every fake LLM answer",
+    )
+    parser.add_argument(
+        "--token-delay",
+        type=float,
+        default=0.0,
+        help="Seconds per generated token in the batch run",
+    )
+    parser.add_argument(
+        "--prompt-delay",
+        type=float,
+        default=0.0,
+        help="Seconds of prompt evaluation per LLM request in the batch run",  # nopep8
+    )
+    parser.add_argument(
+        "--render-delay",
+        type=float,
+        default=0.0,
+        help="Seconds per avatar in the batch run",
+    )
+    parser.add_argument("--llm-instances", type=int, default=1)
+    parser.add_argument("--llm-batch-size", type=int, default=1)
+    parser.add_argument(
+        "--smoke",
+        action="store_true",
+        help="Only check that one character is generated and exported",
+    )
+    args = parser.parse_args()
+
+    cli.profile = get_profile(args.model_profile)
+    if args.smoke:
+        working_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as output_dir:
+            os.chdir(output_dir)
+            try:
+                missing = smoke(args)
+            finally:
+                os.chdir(working_dir)
+        for name in missing:
+            print(f"missing: {name}")
+        print("FAIL" if missing else "ok")
+        sys.exit(1 if missing else 0)
+
+    print(
+        f"{'characters':>10}{'scheduling':>14}{'avatar':>12}"
+        f"{'serialization':>16}{'card export':>14}{'batch':>14}"
+    )
+    working_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        for count in args.characters:
+            run_args = character_args(args)
+            # The pipeline prints every field it generates.
+            with contextlib.redirect_stdout(io.StringIO()):
+                cli.prepare_sd(run_args)
+                steps = measure_steps(args, run_args, count)
+                throughput = measure_batch(args, run_args, count)
+            print(
+                f"{count:>10}"
+                f"{steps['scheduling'] * 1000:>12.2f}ms"
+                f"{steps['avatar'] * 1000:>10.2f}ms"
+                f"{steps['serialization'] * 1000:>14.2f}ms"
+                f"{steps['card export'] * 1000:>12.2f}ms"
+                f"{throughput:>10.1f}/s"
+            )
+        os.chdir(working_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""OpenAIBackend against a local stand-in for an OpenAI-compatible server.
+
+The stand-in answers ``/v1/completions`` like the llama.cpp server:
+streamed answers are ``text/event-stream`` without a charset, and every
+answer contains non-ASCII text. The check fails if the backend's
+``stream`` or ``invoke`` return anything else than the text the server
+sent.
+
+    python benchmarks/openai_server.py
+"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from core.backends import OpenAIBackend  # noqa: E402
+
+ANSWER = "Zoë café ✨ — 東京"
+
+
+def answer(prompt):
+    return f"{prompt}: {ANSWER}"
+
+
+class CompletionsHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = json.loads(self.rfile.read(length))
+        prompt = body["prompt"]
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for word in answer(prompt).split(" "):
+                chunk = {"choices": [{"index": 0, "text": word + " "}]}
+                line = json.dumps(chunk, ensure_ascii=False)
+                self.wfile.write(f"data: {line}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        data = {"choices": [{"index": 0, "text": answer(prompt)}]}
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def check(name, got, expected):
+    status = "ok" if got == expected else f"FAIL: got {got!r}"
+    print(f"{name:<16}{status}")
+    return got == expected
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompletionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backend = OpenAIBackend(f"http://127.0.0.1:{server.server_port}/v1")
+    try:
+        results = [
+            check(
+                "stream",
+                "".join(backend.stream("a")).strip(),
+                answer("a"),
+            ),
+            check("invoke", backend.invoke("b"), answer("b")),
+        ]
+    finally:
+        server.shutdown()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Time to first token of every generator prompt with and without the
+few-shot prefix cache.
+
+    python benchmarks/prefix_cache_ttft.py --model-profile zephyr
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from core.prefix_cache import PrefixCachedLlama  # noqa: E402
+from core.profiles import PROFILES, get_profile  # noqa: E402
+
+
+def stage_prompts(profile):
+    # The earlier fields get the same short answer the model might give.
+    name = summary = personality = "Jamie Hale"
+    topic = "business"
+    fields = {
+        "name": dict(topic=topic, gender="male"),
+        "summary": dict(name=name, topic=topic, gender="male"),
+        "personality": dict(name=name, summary=summary, topic=topic),
+        "scenario": dict(
+            summary=summary, personality=personality, topic=topic
+        ),
+        "greeting_message": dict(
+            name=name, summary=summary, personality=personality, topic=topic
+        ),
+        "example_messages": dict(
+            name=name, summary=summary, personality=personality, topic=topic
+        ),
+        "avatar_prompt": dict(summary=summary, topic=topic),
+    }
+    return [
+        (stage, profile.prompt(stage, **stage_fields))
+        for stage, stage_fields in fields.items()
+    ]
+
+
+def time_to_first_token(llm, prompt):
+    start = time.perf_counter()
+    stream = llm.stream(prompt)
+    next(stream, None)
+    elapsed = time.perf_counter() - start
+    stream.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model-profile", choices=sorted(PROFILES), default="zephyr"
+    )
+    parser.add_argument("--model", help="GGUF path (defaults to the profile's model)")  # nopep8
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--gpu-layers", type=int, default=0)
+    args = parser.parse_args()
+
+    profile = get_profile(args.model_profile)
+    llm = PrefixCachedLlama(
+        args.model or profile.model_path,
+        turn_marker=profile.turn_marker,
+        gpu_layers=args.gpu_layers,
+        config={"context_length": profile.context_length},
+    )
+    print(f"{'stage':<18}{'no cache':>12}{'cold cache':>12}{'warm cache':>12}")  # nopep8
+    for stage, prompt in stage_prompts(profile):
+        llm.enabled = False
+        uncached = statistics.median(
+            time_to_first_token(llm, prompt) for _ in range(args.runs)
+        )
+        llm.enabled = True
+        llm.clear()
+        cold = time_to_first_token(llm, prompt)
+        warm = statistics.median(
+            time_to_first_token(llm, prompt) for _ in range(args.runs)
+        )
+        print(f"{stage:<18}{uncached:>11.2f}s{cold:>11.2f}s{warm:>11.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Seconds per avatar for every CPU execution setting of Stable Diffusion.
+
+Every setting loads its own pipeline on the CPU, renders one warm-up image
+and then ``--runs`` timed images of the same prompt.
+
+    python benchmarks/sd_cpu.py --runs 3 --threads 4 8
+    python benchmarks/sd_cpu.py --settings fp32 dpm++-20 --model models/dreamshaper_8.safetensors
+"""  # nopep8
+import argparse
+import os
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from core.image_engine import (  # noqa: E402
+    DEFAULT_NEGATIVE_PROMPT,
+    HUB_MODEL,
+    QUALITY_PREFIX,
+    ImageEngine,
+    SDOptions,
+)
+
+SETTINGS = {
+    "fp32": dict(dtype="float32", channels_last=False),
+    "fp32-channels-last": dict(dtype="float32"),
+    "fp32-attention-slicing": dict(dtype="float32", attention_slicing=True),
+    "bf16-channels-last": dict(dtype="bfloat16"),
+    "auto": dict(),
+    "dpm++-20": dict(scheduler="dpm++", steps=20),
+    "dpm++-15": dict(scheduler="dpm++", steps=15),
+}
+
+PROMPT = "male, realistic, human, tailored suit, dark well-groomed hair, blue eyes"  # nopep8
+
+
+def main():
+    import torch
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model",
+        default=HUB_MODEL,
+        help="Checkpoint file or Hub repository to load",
+    )
+    parser.add_argument(
+        "--settings",
+        nargs="+",
+        choices=sorted(SETTINGS),
+        default=list(SETTINGS),
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[torch.get_num_threads()],
+    )
+    parser.add_argument(
+        "--steps",
+        type=int,
+        help="Steps for the settings using the default scheduler (default: 50)",  # nopep8
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'setting':<24}{'threads':>8}{'load':>9}{'s/image':>10}")
+    for name in args.settings:
+        for threads in args.threads:
+            options = dict(steps=args.steps)
+            options.update(SETTINGS[name])
+            engine = ImageEngine(
+                args.model,
+                options=SDOptions(device="cpu", threads=threads, **options),
+            )
+            start = time.perf_counter()
+            engine.load()
+            load = time.perf_counter() - start
+
+            def render():
+                start = time.perf_counter()
+                engine.generate(
+                    QUALITY_PREFIX + PROMPT,
+                    negative_prompt=DEFAULT_NEGATIVE_PROMPT,
+                    seed=0,
+                )
+                return time.perf_counter() - start
+
+            render()
+            per_image = statistics.median(render() for _ in range(args.runs))
+            print(f"{name:<24}{threads:>8}{load:>8.1f}s{per_image:>9.1f}s")
+            engine.unload()
+
+
+if __name__ == "__main__":
+    main()